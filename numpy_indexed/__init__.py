@@ -3,9 +3,11 @@ from __future__ import absolute_import, division, print_function, unicode_litera
 
 import os
 
+from numpy_indexed.index import *
 from numpy_indexed.arraysetops import *
 from numpy_indexed.grouping import *
 from numpy_indexed.funcs import *
+from numpy_indexed.jagged import *
 
 
 __author__ = "Eelco Hoogendoorn"
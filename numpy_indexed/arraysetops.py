@@ -8,6 +8,7 @@ from builtins import *
 
 from numpy_indexed.funcs import *
 from numpy_indexed.index import *
+from numpy_indexed.index import DictionaryIndex, HashIndex, _copy
 from numpy_indexed import semantics
 
 
@@ -16,7 +17,8 @@ __license__ = "LGPL"
 __email__ = "hoogendoorn.eelco@gmail.com"
 
 
-def unique(keys, axis=semantics.axis_default, return_index=False, return_inverse=False, return_count=False):
+def unique(keys, axis=semantics.axis_default, return_index=False, return_inverse=False, return_count=False, method=None,
+           assume_sorted=False):
     """compute the set of unique keys
 
     Parameters
@@ -31,6 +33,11 @@ def unique(keys, axis=semantics.axis_default, return_index=False, return_inverse
         if True, return the indices such that unique[inverse] == keys
     return_count : bool
         if True, return the number of times each unique key occurs in the input
+    method : {None, 'sort', 'counting', 'hash'}, optional
+        algorithm used to index the keys; see as_index.
+        note that with 'hash', the unique keys are not returned in sorted order
+    assume_sorted : bool
+        if True, the keys are assumed to be sorted already, and are not sorted again
 
     Notes
     -----
@@ -38,19 +45,41 @@ def unique(keys, axis=semantics.axis_default, return_index=False, return_inverse
     it is cleaner to call index and its properties directly, should more than unique values be desired as output
     """
     stable = return_index or return_inverse
-    index = as_index(keys, axis, base = not stable, stable = stable)
+    index = as_index(keys, axis, base = not stable, stable = stable, method=method, assume_sorted=assume_sorted)
 
-    ret = index.unique,
+    #the index may hold compact integer types and read-only cached arrays internally;
+    #indices are returned as intp, and all arrays are writable, as numpy does
+    ret = _copy(index.unique),
     if return_index:
-        ret = ret + (index.index,)
+        ret = ret + (index.index.astype(np.intp),)
     if return_inverse:
-        ret = ret + (index.inverse,)
+        ret = ret + (index.inverse.astype(np.intp),)
     if return_count:
-        ret = ret + (index.count,)
+        ret = ret + (_copy(index.count),)
     return ret[0] if len(ret) == 1 else ret
 
 
-def contains(this, that, axis=semantics.axis_default):
+def _search_keys(this, that):
+    """returns the raw keys of two indices, such that the keys of this can be searched for in the keys of that
+    dictionary encoded keys are searched for by their codes, with the keys of this encoded in the dictionary of that
+
+    Parameters
+    ----------
+    this : BaseIndex
+        index over the keys to search for
+    that : Index
+        index over the keys to search in
+
+    Returns
+    -------
+    this_keys, that_keys : ndarray
+    """
+    if isinstance(that, DictionaryIndex):
+        return that.encode(this), that.codes
+    return this._keys, that._keys
+
+
+def contains(this, that, axis=semantics.axis_default, method=None):
     """Returns bool for each element of `that`, indicating if it is contained in `this`
 
     Parameters
@@ -59,6 +88,8 @@ def contains(this, that, axis=semantics.axis_default):
         sequence of items to test against
     that : indexable key sequence
         sequence of items to test for
+    method : {None, 'hash'}, optional
+        if 'hash', `this` is placed in a hash table, rather than sorting `that`
 
     Returns
     -------
@@ -70,11 +101,15 @@ def contains(this, that, axis=semantics.axis_default):
     Reads as 'this contains that'
     Similar to 'that in this', but with different performance characteristics
     """
+    if method == 'hash':
+        return in_(that, this, axis=axis, method=method)
+
     this = as_index(this, axis=axis, lex_as_struct=True, base=True)
     that = as_index(that, axis=axis, lex_as_struct=True)
+    this_keys, that_keys = _search_keys(this, that)
 
-    left = np.searchsorted(that._keys, this._keys, sorter=that.sorter, side='left')
-    right = np.searchsorted(that._keys, this._keys, sorter=that.sorter, side='right')
+    left = np.searchsorted(that_keys, this_keys, sorter=that.sorter, side='left')
+    right = np.searchsorted(that_keys, this_keys, sorter=that.sorter, side='right')
 
     flags = np.zeros(that.size + 1, dtype=int)
     np.add.at(flags, left, 1)
@@ -83,7 +118,7 @@ def contains(this, that, axis=semantics.axis_default):
     return np.cumsum(flags)[:-1].astype(bool)[that.rank]
 
 
-def in_(this, that, axis=semantics.axis_default):
+def in_(this, that, axis=semantics.axis_default, method=None):
     """Returns bool for each element of `this`, indicating if it is present in `that`
 
     Parameters
@@ -92,6 +127,8 @@ def in_(this, that, axis=semantics.axis_default):
         sequence of items to test for
     that : indexable key sequence
         sequence of items to test against
+    method : {None, 'hash'}, optional
+        if 'hash', `that` is placed in a hash table, rather than being sorted
 
     Returns
     -------
@@ -103,11 +140,18 @@ def in_(this, that, axis=semantics.axis_default):
     Reads as 'this in that'
     Similar to 'that contains this', but with different performance characteristics
     """
+    if method == 'hash':
+        that = as_index(that, axis=axis, lex_as_struct=True, base=True, method=method)
+        #an index constructed beforehand may not be a hash index
+        if isinstance(that, HashIndex):
+            return that.lookup(this) != -1
+
     this = as_index(this, axis=axis, lex_as_struct=True, base=True)
     that = as_index(that, axis=axis, lex_as_struct=True)
+    this_keys, that_keys = _search_keys(this, that)
 
-    left = np.searchsorted(that._keys, this._keys, sorter=that.sorter, side='left')
-    right = np.searchsorted(that._keys, this._keys, sorter=that.sorter, side='right')
+    left = np.searchsorted(that_keys, this_keys, sorter=that.sorter, side='left')
+    right = np.searchsorted(that_keys, this_keys, sorter=that.sorter, side='right')
 
     return left != right
 
@@ -149,11 +193,12 @@ def indices(this, that, axis=semantics.axis_default, missing='raise'):
     that = as_index(that, axis=axis, base=True, lex_as_struct=True)
 
     # use raw private keys here, rather than public unpacked keys
-    insertion = np.searchsorted(this._keys, that._keys, sorter=this.sorter, side='left')
-    indices = np.take(this.sorter, insertion, mode='clip')
+    that_keys, this_keys = _search_keys(that, this)
+    insertion = np.searchsorted(this_keys, that_keys, sorter=this.sorter, side='left')
+    indices = np.take(this.sorter, insertion, mode='clip').astype(np.intp, copy=False)
 
     if missing != 'ignore':
-        invalid = this._keys[indices] != that._keys
+        invalid = this_keys[indices] != that_keys
         if missing == 'raise':
             if np.any(invalid):
                 raise KeyError('Not all keys in `that` are present in `this`')
@@ -215,6 +260,8 @@ def _set_preprocess(sets, **kwargs):
         axis to view as item sequence
     assume_unique : bool, optional
         if we should assume the items sequence does not contain duplicates
+    assume_sorted : bool, optional
+        if we should assume the items sequence is sorted already
 
     Returns
     -------
@@ -226,11 +273,12 @@ def _set_preprocess(sets, **kwargs):
     """
     axis            = kwargs.get('axis', semantics.axis_default)
     assume_unique   = kwargs.get('assume_unique', False)
+    assume_sorted   = kwargs.get('assume_sorted', False)
 
     if assume_unique:
-        sets = [as_index(s, axis=axis).unique for s in sets]
+        sets = [as_index(s, axis=axis, assume_sorted=assume_sorted).unique for s in sets]
     else:
-        sets = [as_index(s, axis=axis).unique for s in sets]
+        sets = [as_index(s, axis=axis, assume_sorted=assume_sorted).unique for s in sets]
     return sets
 
 
@@ -299,7 +347,7 @@ def union(*sets, **kwargs):
     union of all items in all sets
     """
     sets = _set_preprocess(sets, **kwargs)
-    return as_index( _set_concatenate(sets), axis=0, base=True).unique
+    return _copy(as_index( _set_concatenate(sets), axis=0, base=True).unique)
 
 
 def intersection(*sets, **kwargs):
@@ -354,7 +402,7 @@ def difference(*sets, **kwargs):
     alt implementation: compute union of tail, then union with head, then use set_count(1)
     """
     head, tail = sets[0], sets[1:]
-    idx = as_index(head, **kwargs)
+    idx = as_index(head, axis=kwargs.get('axis', semantics.axis_default), assume_sorted=kwargs.get('assume_sorted', False))
     lhs = idx.unique
     rhs = [intersection(idx, s, **kwargs) for s in tail]
     return exclusive(lhs, *rhs, axis=0, assume_unique=True)
@@ -7,7 +7,7 @@ from builtins import *
 import numpy as np
 
 from numpy_indexed.grouping import GroupBy, group_by
-from numpy_indexed.index import LexIndex, as_index
+from numpy_indexed.index import LexIndex, as_index, _copy
 from numpy_indexed import semantics
 
 
@@ -16,12 +16,15 @@ __license__ = "LGPL"
 __email__ = "hoogendoorn.eelco@gmail.com"
 
 
-def count(keys, axis=semantics.axis_default):
+def count(keys, axis=semantics.axis_default, method=None):
     """count the number of times each key occurs in the input set
 
     Arguments
     ---------
     keys : indexable object
+    method : {None, 'sort', 'counting', 'hash'}, optional
+        algorithm used to index the keys; see as_index.
+        note that with 'hash', the unique keys are not returned in sorted order
 
     Returns
     -------
@@ -35,8 +38,8 @@ def count(keys, axis=semantics.axis_default):
     Can be seen as numpy work-alike of collections.Counter
     Alternatively, as sparse equivalent of count_table
     """
-    index = as_index(keys, axis, base=True)
-    return index.unique, index.count
+    index = as_index(keys, axis, base=True, method=method)
+    return _copy(index.unique), _copy(index.count)
 
 
 def count_table(*keys):
@@ -213,7 +216,7 @@ def rank(keys, axis=semantics.axis_default):
     we should have that index.sorted[index.rank] == keys
     """
     index = as_index(keys, axis)
-    return index.rank
+    return index.rank.astype(np.intp, copy=False)
 
 
 def mode(keys, axis=semantics.axis_default, weights=None, return_indices=False):
@@ -243,7 +246,7 @@ def mode(keys, axis=semantics.axis_default, weights=None, return_indices=False):
     bin = np.argmax(weights)
     _mode = unique[bin]     # FIXME: replace with index.take for lexindex compatibility?
     if return_indices:
-        indices = index.sorter[index.start[bin]: index.stop[bin]]
+        indices = index.sorter[index.start[bin]: index.stop[bin]].astype(np.intp)
         return _mode, indices
     else:
         return _mode
@@ -256,7 +259,7 @@ def sort(keys, axis=semantics.axis_default):
 
 def argsort(keys, axis=semantics.axis_default):
     """return the indices that will place the keys in sorted order"""
-    return as_index(keys, axis).sorter
+    return as_index(keys, axis).sorter.astype(np.intp, copy=False)
 
 
 def searchsorted(keys, axis=semantics.axis_default, side='left', sorter=None):
@@ -3,10 +3,12 @@ from __future__ import absolute_import, division, print_function, unicode_litera
 from builtins import *
 
 import itertools
+import multiprocessing
+from collections import OrderedDict
 
 import numpy as np
-from numpy_indexed.index import as_index
-import numpy_indexed as npi
+from numpy_indexed.index import as_index, ExternalIndex, _concatenate, _copy
+from numpy_indexed.jagged import JaggedArray
 
 __author__ = "Eelco Hoogendoorn"
 __license__ = "LGPL"
@@ -20,7 +22,7 @@ class GroupBy(object):
     contains an index of keys, and extends the index functionality with grouping-specific functionality
     """
 
-    def __init__(self, keys, axis=0):
+    def __init__(self, keys, axis=0, assume_sorted=False, backend='auto', compact=True):
         """
         Parameters
         ----------
@@ -28,26 +30,43 @@ class GroupBy(object):
             sequence of keys to group by
         axis : int, optional
             axis to regard as the key-sequence, in case keys is multi-dimensional
+        assume_sorted : bool, optional
+            if True, the keys are assumed to be sorted already, and are not sorted again
+        backend : {'auto', 'sort', 'scatter'}, optional
+            algorithm used for sums of floating point values, as taken by sum, mean and var.
+            'sort' permutes the values into the order of the sorted keys, and reduces each contiguous group.
+            'scatter' accumulates the values into their groups with bincount, through the inverse of the index;
+            this avoids a permuted copy of the values, but accumulates in double precision.
+            'auto' scatters narrow values if the inverse is at hand, and sorts otherwise;
+            variances take three scattering passes, and are only scattered on request
+        compact : bool, optional
+            if False, the index holds its index arrays as intp, rather than in the narrowest integer type possible
 
         See Also
         --------
         numpy_indexed.as_index : for information regarding the casting rules to a valid Index object
         """
-        self.index = as_index(keys, axis)
+        if backend not in ('auto', 'sort', 'scatter'):
+            raise ValueError("backend should be one of 'auto', 'sort' or 'scatter'")
+        self.index = as_index(keys, axis, assume_sorted=assume_sorted, compact=compact)
+        self.backend = backend
+
+    #groups of at least this many keys are scanned by ufunc.accumulate, rather than by a segmented scan; see scan
+    scan_block = 256
 
     #forward interesting/'public' index properties
     @property
     def unique(self):
         """unique keys"""
-        return self.index.unique
+        return _copy(self.index.unique)
     @property
     def count(self):
         """count of each unique key"""
-        return self.index.count
+        return _copy(self.index.count)
     @property
     def inverse(self):
         """mapping such that unique[inverse]==keys"""
-        return self.index.inverse
+        return self.index.inverse.astype(np.intp)
     @property
     def groups(self):
         """int, number of groups formed by the keys"""
@@ -85,7 +104,7 @@ class GroupBy(object):
                         return v
                     cache[i] = v
         s = iter(self.index.sorter)
-        for c in self.count:
+        for c in self.index.count:
             yield (get_value(i) for i in itertools.islice(s, int(c)))
 
     def split_iterable_as_unordered_iterable(self, values):
@@ -107,10 +126,10 @@ class GroupBy(object):
         """
         from collections import defaultdict
         cache = defaultdict(list)
-        count = self.count
+        count = self.index.count
         unique = self.unique
         key = (lambda i: unique[i]) if isinstance(unique, np.ndarray) else (lambda i: tuple(c[i] for c in unique))
-        for i,v in zip(self.inverse, values):
+        for i,v in zip(self.index.inverse, values):
             cache[i].append(v)
             if len(cache[i]) == count[i]:
                 yield key(i), cache.pop(i)
@@ -132,9 +151,9 @@ class GroupBy(object):
         This is the preferred method if values has random access, but we dont want it completely in memory.
         Like a big memory mapped file, for instance
         """
-        print(self.count)
+        print(self.index.count)
         s = iter(self.index.sorter)
-        for c in self.count:
+        for c in self.index.count:
             yield (values[i] for i in itertools.islice(s, int(c)))
 
     def split_array_as_array(self, values):
@@ -175,8 +194,24 @@ class GroupBy(object):
         values = values[self.index.sorter]
         return np.split(values, self.index.slices[1:-1], axis=0)
 
-    def split(self, values):
-        """some sensible defaults"""
+    def split_array_as_jagged(self, values):
+        """Group values as a jagged array, without creating an array object per group
+
+        Parameters
+        ----------
+        values : ndarray, [keys, ...]
+
+        Returns
+        -------
+        JaggedArray, [groups, key_count, ...]
+            values in the order of the sorted keys, with the slices of the index as offsets
+        """
+        return JaggedArray(self._sort_values(np.asarray(values)), self.index.slices.astype(np.intp, copy=False))
+
+    def split(self, values, jagged=False):
+        """some sensible defaults; if jagged, a JaggedArray is returned"""
+        if jagged:
+            return self.split_array_as_jagged(values)
         try:
             return self.split_array_as_array(values)
         except:
@@ -209,9 +244,120 @@ class GroupBy(object):
         ndarray, [groups, ...]
         values reduced by operator over the key-groups
         """
-        values = np.take(values, self.index.sorter, axis=axis)
+        values = np.asarray(values)
+        if isinstance(self.index, ExternalIndex) and self.index.size:
+            return self._reduce_blocks(values, operator, axis, dtype)
+        if self._scatter(values, operator, axis, dtype):
+            return self._reduce_scatter(values, axis, dtype)
+        return self._reduce_sorted(self._sort_values(values, axis), operator, axis, dtype)
+
+    def _scatter(self, values, operator=np.add, axis=0, dtype=None):
+        """whether to reduce by scattering the values into their groups, rather than sorting them"""
+        if self.backend == 'sort' or operator is not np.add or isinstance(self.index, ExternalIndex):
+            return False
+        #bincount accumulates real values in double precision
+        if values.dtype.kind != 'f' or (dtype is not None and np.dtype(dtype).kind != 'f'):
+            return False
+        if self.backend == 'scatter':
+            return True
+        #each column is scattered separately, while the presorted or uncached cases make sorting cheap
+        narrow = values.ndim == 1 or values.size <= 2 * values.shape[axis]
+        return narrow and not self.index.presorted and 'inverse' in self.index.cache_info
+
+    def _reduce_scatter(self, values, axis=0, dtype=None):
+        """sum values over groups by accumulating each column with bincount"""
+        values = np.moveaxis(values, axis, -1)
+        columns = values.reshape(-1, values.shape[-1])
+        reduced = np.empty((len(columns), self.groups), dtype or values.dtype)
+        for column, r in zip(columns, reduced):
+            r[...] = np.bincount(self.index.inverse, column, self.groups)
+        return np.moveaxis(reduced.reshape(values.shape[:-1] + (self.groups,)), -1, axis)
+
+    def _sort_values(self, values, axis=0):
+        """permute values along the given axis into the order of the sorted keys"""
+        if self.index.presorted:
+            return values
+        return np.take(values, self.index.sorter, axis=axis)
+
+    def _reduce_sorted(self, values, operator=np.add, axis=0, dtype=None):
+        """reduce values which are in the order of the sorted keys already"""
         return operator.reduceat(values, self.index.start, axis=axis, dtype=dtype)
 
+    def _group_shape(self, ndim, axis=0):
+        """shape to which to reshape an array with a value per group, to broadcast against reduced values"""
+        shape = [1] * ndim
+        shape[axis] = self.groups
+        return shape
+
+    def _reduce_blocks(self, values, operator, axis, dtype):
+        """reduce over an index which does not fit in memory, by streaming over blocks of groups"""
+        slices = self.index.slices
+        reduced = []
+        for start, stop in self.index.blocks():
+            lo, hi = slices[start], slices[stop]
+            block = np.take(values, np.asarray(self.index.sorter[lo:hi]), axis=axis)
+            reduced.append(operator.reduceat(block, np.asarray(slices[start:stop]) - lo, axis=axis, dtype=dtype))
+        return np.concatenate(reduced, axis=axis)
+
+
+    def aggregate(self, values, stats, axis=0, dtype=None):
+        """compute multiple statistics over each group, permuting the values into sorted order only once
+
+        Parameters
+        ----------
+        values : array_like, [keys, ...]
+            values to compute statistics of per group
+        stats : sequence of str
+            names of the statistics to compute; any of
+            'count', 'sum', 'prod', 'mean', 'var', 'std', 'min', 'max', 'first', 'last'
+        axis : int, optional
+            alternative reduction axis for values
+        dtype : output dtype
+
+        Returns
+        -------
+        unique: ndarray, [groups]
+            unique keys
+        reduced : OrderedDict of str to ndarray, [groups, ...]
+            value array reduced over groups, for each of the requested statistics
+        """
+        values = np.asarray(values)
+        if isinstance(self.index, ExternalIndex):
+            #the values are not permuted as a whole, but in blocks for each statistic
+            sorted = None
+        else:
+            sorted = self._sort_values(values, axis)
+        count = self.index.count.reshape(self._group_shape(values.ndim, axis))
+        computed = {}
+
+        def compute(stat):
+            if stat == 'count':
+                return self.count
+            if stat in ('sum', 'prod', 'min', 'max'):
+                operator = {'sum': np.add, 'prod': np.multiply, 'min': np.minimum, 'max': np.maximum}[stat]
+                if sorted is None:
+                    return self.reduce(values, operator, axis, dtype)
+                return self._reduce_sorted(sorted, operator, axis, dtype)
+            if stat in ('first', 'last'):
+                if sorted is None:
+                    return getattr(self, stat)(values, axis)[1]
+                return np.take(sorted, self.index.start if stat == 'first' else self.index.stop - 1, axis)
+            if stat == 'mean':
+                return get('sum') / count
+            if stat == 'var':
+                if sorted is None:
+                    return self.var(values, axis, dtype=dtype)[1]
+                return self._comoment_sorted(sorted, sorted, None, axis, dtype)
+            if stat == 'std':
+                return np.sqrt(get('var'))
+            raise ValueError('Unknown statistic: {}'.format(stat))
+
+        def get(stat):
+            if stat not in computed:
+                computed[stat] = compute(stat)
+            return computed[stat]
+
+        return self.unique, OrderedDict((stat, get(stat)) for stat in stats)
 
     def sum(self, values, axis=0, dtype=None):
         """compute the sum over each group
@@ -278,9 +424,7 @@ class GroupBy(object):
         values = np.asarray(values)
         if weights is None:
             result = self.reduce(values, axis=axis, dtype=dtype)
-            shape = [1] * values.ndim
-            shape[axis] = self.groups
-            weights = self.count.reshape(shape)
+            weights = self.index.count.reshape(self._group_shape(values.ndim, axis))
         else:
             weights = np.asarray(weights)
             result = self.reduce(values * weights, axis=axis, dtype=dtype)
@@ -296,6 +440,31 @@ class GroupBy(object):
             values to take variance of per group
         axis : int, optional
             alternative reduction axis for values
+        weights : ndarray, [keys, ...], optional
+            weight to use for each value
+
+        Returns
+        -------
+        unique: ndarray, [groups]
+            unique keys
+        reduced : ndarray, [groups, ...]
+            value array, reduced over groups
+        """
+        return self.unique, self._comoment(values, None, axis, weights, dtype)
+
+    def cov(self, x, y, axis=0, weights=None, dtype=None):
+        """compute the covariance of x and y over each group
+
+        Parameters
+        ----------
+        x : array_like, [keys, ...]
+            first values to take the covariance of per group
+        y : array_like, [keys, ...]
+            second values to take the covariance of per group, of the same shape as x
+        axis : int, optional
+            alternative reduction axis for values
+        weights : ndarray, [keys, ...], optional
+            weight to use for each value
 
         Returns
         -------
@@ -304,21 +473,53 @@ class GroupBy(object):
         reduced : ndarray, [groups, ...]
             value array, reduced over groups
         """
-        values = np.asarray(values)
-        unique, mean = self.mean(values, axis, weights, dtype)
-        err = values - mean.take(self.inverse, axis)
+        return self.unique, self._comoment(x, y, axis, weights, dtype)
 
+    def _comoment(self, x, y, axis=0, weights=None, dtype=None):
+        """weighted covariance of x and y within each group; the variance of x if y is None"""
+        x = np.asarray(x)
+        if weights is not None:
+            weights = np.asarray(weights)
+            if weights.ndim == 1 and x.ndim > 1:
+                #a single weight per key applies to all values of that key
+                weights = weights.reshape([-1 if i == axis else 1 for i in range(x.ndim)])
+            weights = np.broadcast_to(weights, x.shape)
+        if isinstance(self.index, ExternalIndex) or (self.backend == 'scatter' and self._scatter(x, np.add, axis, dtype)):
+            #stream over the values in blocks of groups, or scatter them, rather than permuting them as a whole
+            w = 1 if weights is None else weights
+            total = self.index.count.reshape(self._group_shape(x.ndim, axis)) if weights is None else self.reduce(weights, axis=axis, dtype=dtype)
+            ex = x - (self.reduce(x * w, axis=axis, dtype=dtype) / total).take(self.index.inverse, axis)
+            ey = ex if y is None else y - (self.reduce(y * w, axis=axis, dtype=dtype) / total).take(self.index.inverse, axis)
+            return self.reduce(ex * ey * w, axis=axis, dtype=dtype) / total
+        x = self._sort_values(x, axis)
+        y = x if y is None else self._sort_values(np.asarray(y), axis)
+        weights = None if weights is None else self._sort_values(weights, axis)
+        return self._comoment_sorted(x, y, weights, axis, dtype)
+
+    def _comoment_sorted(self, x, y, weights=None, axis=0, dtype=None):
+        """weighted covariance of x and y within each group, from values in the order of the sorted keys
+
+        the group means are subtracted before taking products, which avoids the catastrophic cancellation
+        of the single pass sum of squares formula; the means are broadcast by repeating them over the sorted values,
+        which avoids a gather through the inverse, and the centered values are updated in place
+        """
         if weights is None:
-            shape = [1] * values.ndim
-            shape[axis] = self.groups
-            group_weights = self.count.reshape(shape)
-            var = self.reduce(err ** 2, axis=axis, dtype=dtype)
+            total = self.index.count.reshape(self._group_shape(x.ndim, axis))
         else:
-            weights = np.asarray(weights)
-            group_weights = self.reduce(weights, axis=axis, dtype=dtype)
-            var = self.reduce(weights * err ** 2, axis=axis, dtype=dtype)
+            total = self._reduce_sorted(weights, axis=axis, dtype=dtype)
 
-        return unique, var / group_weights
+        def center(v):
+            weighted = v if weights is None else v * weights
+            mean = self._reduce_sorted(weighted, axis=axis, dtype=dtype) / total
+            err = np.repeat(mean, self.index.count, axis)
+            return np.subtract(v, err, out=err)
+
+        ex = center(x)
+        ey = ex if y is x else center(y)
+        product = np.multiply(ex, ey, out=ex)
+        if weights is not None:
+            np.multiply(product, weights, out=product)
+        return self._reduce_sorted(product, axis=axis, dtype=dtype) / total
 
     def std(self, values, axis=0, weights=None, dtype=None):
         """standard deviation over each group
@@ -359,29 +560,137 @@ class GroupBy(object):
         reduced : ndarray, [groups, ...]
             value array, reduced over groups
         """
-        mid_2 = self.index.start + self.index.stop
-        hi = (mid_2    ) // 2
-        lo = (mid_2 - 1) // 2
+        return self.quantile(values, 0.5, axis, 'midpoint' if average else 'higher')
 
-        #need this indirection for lex-index compatibility
-        sorted_group_rank_per_key = self.index.sorted_group_rank_per_key
+    def quantile(self, values, q, axis=0, interpolation='linear'):
+        """compute quantiles of the values within each group
 
-        def median1d(slc):
-            #place values at correct keys; preconditions the upcoming lexsort
-            slc    = slc[self.index.sorter]
-            #refine value sorting within each keygroup
-            sorter = np.lexsort((slc, sorted_group_rank_per_key))
-            slc    = slc[sorter]
-            return (slc[lo]+slc[hi]) / 2 if average else slc[hi]
+        Parameters
+        ----------
+        values : array_like, [keys, ...]
+            values to compute the quantiles of per group
+        q : float or array_like of float
+            quantiles to compute, in the interval [0, 1]
+        axis : int, optional
+            alternative reduction axis for values
+        interpolation : {'linear', 'lower', 'higher', 'midpoint', 'nearest'}
+            how to interpolate between the two values nearest to a quantile, as for np.quantile
 
-        values = np.asarray(values)
-        if values.ndim>1:   #is trying to skip apply_along_axis somewhat premature optimization?
-            values = np.apply_along_axis(median1d, axis, values)
+        Returns
+        -------
+        unique: ndarray, [groups]
+            unique keys
+        reduced : ndarray, [groups, ...], or [len(q), groups, ...] for an array of quantiles
+            value array, reduced over groups
+
+        Notes
+        -----
+        All columns of values are sorted within their groups at once,
+        by sorting each column by value, and then stably by the group of each value
+        """
+        q = np.asarray(q, dtype=float)
+        if np.any((q < 0) | (q > 1)):
+            raise ValueError('Quantiles should be in the interval [0, 1]')
+        if interpolation not in ('linear', 'lower', 'higher', 'midpoint', 'nearest'):
+            raise ValueError('Unknown interpolation: {}'.format(interpolation))
+
+        values = np.moveaxis(np.asarray(values), axis, 0)
+        shape = values.shape
+        values = values.reshape(len(values), -1)
+        values = np.take_along_axis(values, self._sort_within_groups(values), axis=0)
+
+        offset = q[..., None] * (self.index.count - 1)
+        position = self.index.start + offset
+        lo, hi = np.floor(position).astype(int), np.ceil(position).astype(int)
+        if interpolation == 'lower':
+            result = values[lo]
+        elif interpolation == 'higher':
+            result = values[hi]
+        elif interpolation == 'nearest':
+            #ties are rounded to even, relative to the start of each group
+            result = values[self.index.start + np.around(offset).astype(int)]
+        elif interpolation == 'midpoint':
+            result = (values[lo] + values[hi]) / 2
+        else:
+            result = values[lo] + (values[hi] - values[lo]) * (position - lo)[..., None]
+
+        result = result.reshape(q.shape + (self.groups,) + shape[1:])
+        return self.unique, np.moveaxis(result, q.ndim, q.ndim + axis)
+
+    def _sort_within_groups(self, values, descending=False):
+        """indices which sort each column of a 2d array of values by group, and by value within each group
+        each column is sorted by value first, and then stably by the group of each value
+
+        Parameters
+        ----------
+        values : ndarray, [keys, columns]
+            values to sort
+        descending : bool, optional
+            if true, values are sorted in descending order within each group; equal values remain in original order
+
+        Returns
+        -------
+        ndarray, [keys, columns], int
+            indices into values along the first axis
+        """
+        if descending:
+            #sort the reversed values in ascending stable order; reversed again, equal values are in original order
+            order = (len(values) - 1 - np.argsort(values[::-1], axis=0, kind='stable'))[::-1]
         else:
-            values = median1d(values)
-        return self.unique, values
+            order = np.argsort(values, axis=0, kind='stable')
+        group_order = np.argsort(self.index.inverse[order], axis=0, kind='stable')
+        return np.take_along_axis(order, group_order, axis=0)
+
+    def topk(self, values, k, axis=0, largest=True, return_index=True):
+        """select the k largest or smallest values within each group
 
-    def mode(self, values, weights=None):
+        Parameters
+        ----------
+        values : array_like, [keys, ...]
+            values to select from per group
+        k : int
+            number of values to select per group
+        axis : int, optional
+            alternative reduction axis for values
+        largest : bool, optional
+            if true, the largest values are selected, in descending order; otherwise the smallest, in ascending order
+            of equal values, the first occurrences are selected first
+        return_index : bool, optional
+            if true, the indices into values of the selected values are returned as well
+
+        Returns
+        -------
+        unique: ndarray, [groups]
+            unique keys
+        selected : masked_array, [groups, k, ...]
+            selected values per group; masked where a group has less than k values.
+            the axes of the groups and of the k values per group take the place of the reduction axis
+        index : masked_array, [groups, k, ...], int, optional
+            indices into values along the reduction axis of the selected values;
+            for axis=0, values[index]==selected
+        """
+        values = np.asarray(values)
+        axis = range(values.ndim)[axis]
+        values = np.moveaxis(values, axis, 0)
+        shape = values.shape
+        values = values.reshape(len(values), -1)
+        order = self._sort_within_groups(values, descending=largest)
+
+        rank = np.arange(k)
+        valid = rank < self.index.count[:, None]
+        position = np.minimum(self.index.start[:, None] + rank, self.index.stop[:, None] - 1)
+        index = order[position]
+        selected = np.take_along_axis(values, index.reshape(-1, index.shape[-1]), axis=0)
+
+        shape = (self.groups, k) + shape[1:]
+        mask = np.broadcast_to(~valid.reshape(valid.shape + (1,) * (len(shape) - 2)), shape)
+        selected = np.moveaxis(np.ma.masked_array(selected.reshape(shape), mask), (0, 1), (axis, axis + 1))
+        if return_index:
+            index = np.moveaxis(np.ma.masked_array(index.reshape(shape), mask), (0, 1), (axis, axis + 1))
+            return self.unique, selected, index
+        return self.unique, selected
+
+    def mode(self, values, weights=None, return_count=False):
         """compute the mode within each group.
 
         Parameters
@@ -390,6 +699,8 @@ class GroupBy(object):
             values to compute the mode of per group
         weights : array_like, [keys], float, optional
             optional weight associated with each entry in values
+        return_count : bool, optional
+            if true, the count, or total weight, of the mode of each group is returned as well
 
         Returns
         -------
@@ -397,14 +708,57 @@ class GroupBy(object):
             unique keys
         reduced : ndarray, [groups, ...]
             value array, reduced over groups
+            of values occurring equally often, the smallest is taken
+        count : ndarray, [groups]
+            count, or total weight, of the mode of each group; only returned if return_count is true
         """
-        if weights is None:
-            unique, weights = npi.count((self.index.sorted_group_rank_per_key, values))
-        else:
-            unique, weights = npi.group_by((self.index.sorted_group_rank_per_key, values)).sum(weights)
+        group, values, counts = self._value_counts(values, weights)
+        #the pairs are sorted by group, so the argmax of each group can be found without another sort
+        best = GroupBy(group, assume_sorted=True)._arg_extremum(counts, np.maximum)
+        if return_count:
+            return self.unique, values[best], counts[best]
+        return self.unique, values[best]
 
-        x, bin = npi.group_by(unique[0]).argmax(weights)
-        return x, unique[1][bin]
+    def value_counts(self, values, weights=None):
+        """count the occurrences of each distinct value within each group, as a sparse table
+
+        Parameters
+        ----------
+        values : array_like, [keys, ...]
+            values to count per group
+        weights : array_like, [keys], float, optional
+            optional weight associated with each entry in values, to be summed instead of counted
+
+        Returns
+        -------
+        keys : ndarray, [pairs]
+            key of each pair of key and value occurring together
+        values : ndarray, [pairs, ...]
+            value of each pair
+        counts : ndarray, [pairs]
+            number of occurrences, or total weight, of each pair
+
+        Notes
+        -----
+        pairs are sorted by key, and by value within each key
+        """
+        group, values, counts = self._value_counts(values, weights)
+        unique = self.unique
+        keys = tuple(u[group] for u in unique) if isinstance(unique, tuple) else unique[group]
+        return keys, values, counts
+
+    def _value_counts(self, values, weights=None):
+        """group, value and count of each distinct pair of group and value, using a single sort
+        pairs of integer values and groups are sorted as a packed composite key"""
+        values = np.asarray(values)
+        if values.ndim > 1:
+            #encode rows of values as integers, to form pairs with the groups
+            rows = as_index(values)
+            group, code, counts = self._value_counts(rows.inverse, weights)
+            return group, rows.unique[code], counts
+        pairs = GroupBy((values, self.index.inverse))
+        counts = pairs.count if weights is None else pairs.sum(weights)[1]
+        return pairs.unique[1], pairs.unique[0], counts
 
     def min(self, values, axis=0):
         """return the minimum within each group
@@ -528,52 +882,551 @@ class GroupBy(object):
         values = np.asarray(values)
         return self.unique, self.reduce(values, axis=axis, operator=np.multiply) != 0
 
-    def argmin(self, values):
+    def argmin(self, values, axis=0):
         """return the index into values corresponding to the minimum value of the group
 
         Parameters
         ----------
-        values : array_like, [keys]
+        values : array_like, [keys, ...]
             values to pick the argmin of per group
+        axis : int, optional
+            alternative reduction axis for values
 
         Returns
         -------
         unique: ndarray, [groups]
             unique keys
-        argmin : ndarray, [groups]
+        argmin : ndarray, [groups, ...]
             index into value array, representing the argmin per group
         """
-        keys, minima = self.min(values)
-        minima = minima[self.inverse]
-        # select the first occurence of the minimum in each group
-        index = as_index((self.inverse, values == minima))
-        return keys, index.sorter[index.start[-self.groups:]]
+        return self.unique, self._arg_extremum(values, np.minimum, axis)
 
-    def argmax(self, values):
+    def argmax(self, values, axis=0):
         """return the index into values corresponding to the maximum value of the group
 
         Parameters
         ----------
-        values : array_like, [keys]
+        values : array_like, [keys, ...]
             values to pick the argmax of per group
+        axis : int, optional
+            alternative reduction axis for values
 
         Returns
         -------
         unique: ndarray, [groups]
             unique keys
-        argmax : ndarray, [groups]
+        argmax : ndarray, [groups, ...]
             index into value array, representing the argmax per group
         """
-        keys, maxima = self.max(values)
-        maxima = maxima[self.inverse]
-        # select the first occurence of the maximum in each group
-        index = as_index((self.inverse, values == maxima))
-        return keys, index.sorter[index.start[-self.groups:]]
+        return self.unique, self._arg_extremum(values, np.maximum, axis)
+
+    def _arg_extremum(self, values, operator, axis=0):
+        """index of the first occurrence of the extremum of each group, in a single pass over the sorted values
+
+        the sorted positions holding the extremum are reduced with a minimum, which selects the first occurrence,
+        since the sorter is stable; like numpy, a nan is the extremum of a group containing one
+        """
+        values = np.moveaxis(np.asarray(values), axis, 0)
+        sorted = self._sort_values(values)
+        extremum = np.repeat(self._reduce_sorted(sorted, operator), self.index.count, axis=0)
+        selected = sorted == extremum
+        if values.dtype.kind in 'fc':
+            selected |= np.isnan(sorted)
+        position = np.arange(self.index.size).reshape([-1] + [1] * (values.ndim - 1))
+        first = np.minimum.reduceat(np.where(selected, position, self.index.size), self.index.start, axis=0)
+        sorter = np.arange(self.index.size) if self.index.presorted else self.index.sorter
+        return np.moveaxis(np.asarray(sorter)[first].astype(np.intp, copy=False), 0, axis)
+
+    def argsort_within(self, values, axis=0, descending=False):
+        """indices which sort the values by group, and by value within each group
+
+        Parameters
+        ----------
+        values : array_like, [keys, ...]
+            values to sort within each group
+        axis : int, optional
+            alternative axis for values
+        descending : bool, optional
+            if true, values are sorted in descending order within each group; equal values remain in original order
+
+        Returns
+        -------
+        ndarray, [keys, ...], int
+            indices into values along the given axis, such that values taken along axis
+            are in the order of the sorted keys, and sorted within each group
+        """
+        values = np.moveaxis(np.asarray(values), axis, 0)
+        order = self._sort_within_groups(values.reshape(len(values), -1), descending)
+        return np.moveaxis(order.reshape(values.shape), 0, axis)
+
+    # transform methods; these broadcast reductions back to an array aligned with the keys
+    def transform(self, values, reduction='mean', axis=0, out=None):
+        """broadcast a reduction of the values over each group back to the keys of each group
+
+        Parameters
+        ----------
+        values : array_like, [keys, ...]
+            values to reduce per group
+        reduction : str or numpy.ufunc
+            name of a reduction method of GroupBy, such as 'mean' or 'max', or a ufunc to reduce with, see reduce
+        axis : int, optional
+            alternative reduction axis for values
+        out : ndarray, [keys, ...], optional
+            array to write the result into
+
+        Returns
+        -------
+        ndarray, [keys, ...]
+            the reduced value of the group of each key
+        """
+        values = np.asarray(values)
+        if isinstance(reduction, np.ufunc):
+            reduced = self.reduce(values, reduction, axis)
+        elif reduction == 'count':
+            reduced = np.broadcast_to(self.index.count.reshape(self._group_shape(values.ndim, axis)), values.shape[:axis] + (self.groups,) + values.shape[axis+1:])
+        else:
+            reduced = getattr(self, reduction)(values, axis=axis)[1]
+        return self._broadcast(reduced, axis, out)
+
+    def _broadcast(self, reduced, axis=0, out=None):
+        """gather reduced values per group into an array aligned with the keys, optionally into a given output"""
+        if out is not None:
+            reduced = np.asarray(reduced).astype(out.dtype, copy=False)
+        #the inverse is valid by construction; clipping avoids buffering of the output
+        return np.take(reduced, self.index.inverse, axis=axis, out=out, mode='clip')
+
+    def _output(self, values, dtype, out):
+        """allocate an output array for a transform, if none is given"""
+        if out is None:
+            out = np.empty(values.shape, np.result_type(values, dtype))
+        return out
+
+    def _combine(self, operator, values, reduced, axis=0, out=None, dtype=None):
+        """apply a binary ufunc to the values and the reduced value of their group, into out
+        the reduced values are gathered into out directly, unless out is the values, as for an in-place transform"""
+        out = self._output(values, reduced.dtype if dtype is None else dtype, out)
+        if np.may_share_memory(values, out):
+            broadcast = self._broadcast(reduced, axis)
+        else:
+            broadcast = self._broadcast(reduced, axis, out)
+        return operator(values, broadcast, out=out)
+
+    def demean(self, values, axis=0, out=None):
+        """subtract the mean of each group from its values
+
+        Parameters
+        ----------
+        values : array_like, [keys, ...]
+            values to subtract the group mean from
+        axis : int, optional
+            alternative reduction axis for values
+        out : ndarray, [keys, ...], optional
+            array to write the result into
+
+        Returns
+        -------
+        ndarray, [keys, ...]
+            the values, minus the mean of their group
+        """
+        values = np.asarray(values)
+        unique, mean = self.mean(values, axis)
+        return self._combine(np.subtract, values, mean, axis, out)
+
+    def zscore(self, values, axis=0, out=None):
+        """standardize the values of each group, to zero mean and unit standard deviation
+
+        Parameters
+        ----------
+        values : array_like, [keys, ...]
+            values to standardize per group
+        axis : int, optional
+            alternative reduction axis for values
+        out : ndarray, [keys, ...], optional
+            array to write the result into
+
+        Returns
+        -------
+        ndarray, [keys, ...]
+            the values, minus the mean of their group, divided by the standard deviation of their group
+        """
+        values = np.asarray(values)
+        unique, stats = self.aggregate(values, ['mean', 'std'], axis)
+        out = self._combine(np.subtract, values, stats['mean'], axis, out)
+        return np.divide(out, self._broadcast(stats['std'], axis), out=out)
+
+    def normalize(self, values, axis=0, out=None):
+        """divide the values of each group by the sum of the group, such that each group sums to one
+
+        Parameters
+        ----------
+        values : array_like, [keys, ...]
+            values to normalize per group
+        axis : int, optional
+            alternative reduction axis for values
+        out : ndarray, [keys, ...], optional
+            array to write the result into
+
+        Returns
+        -------
+        ndarray, [keys, ...]
+            the values, divided by the sum of their group
+        """
+        values = np.asarray(values)
+        total = self.reduce(values, axis=axis)
+        #as for true division in numpy, inexact types are retained, and integers are divided as doubles
+        dtype = total.dtype if total.dtype.kind in 'fc' else np.result_type(total.dtype, np.float64)
+        return self._combine(np.divide, values, total, axis, out, dtype)
+
+    # scan methods; these return an array aligned with the keys, rather than one value per group
+    def _position_in_group(self):
+        """position of each key in the sorted order within its group"""
+        start = np.repeat(self.index.start, self.index.count)
+        return np.arange(self.index.size, dtype=start.dtype) - start
+
+    def _unsort(self, values, axis=0):
+        """inverse of _sort_values; permute values in the order of the sorted keys back into the order of the keys"""
+        if self.index.presorted:
+            return values
+        result = np.empty_like(values)
+        np.moveaxis(result, axis, 0)[self.index.sorter] = np.moveaxis(values, axis, 0)
+        return result
+
+    def scan(self, values, operator=np.add, axis=0, dtype=None):
+        """Accumulate the values within each group, using the given ufunc
+        the scan is over the given axis, which should have elements corresponding to the keys
+        all other axes are treated indepenently for the sake of this scan
+
+        Parameters
+        ----------
+        values : ndarray, [keys, ...]
+            values to accumulate
+        operator : numpy.ufunc
+            a binary numpy ufunc, such as np.add or np.maximum
+        axis : int, optional
+            the axis to accumulate over
+        dtype : output dtype
+
+        Returns
+        -------
+        ndarray, [keys, ...]
+            accumulation of the values of each group up to and including each key, in the order of the keys
+
+        Notes
+        -----
+        The scan is performed on the values in the order of the sorted keys. Groups of at least scan_block keys
+        are accumulated one by one with operator.accumulate, which takes at most size / scan_block calls.
+        The smaller groups are scanned together by a segmented scan, which doubles the distance over which values
+        are combined in each pass, such that at most log2(scan_block) passes are required.
+        The scan thus takes O(n log(scan_block)) time; O(n) for a fixed scan_block.
+        Integer sums are computed by a single cumulative sum instead, from which the sum preceding each group is subtracted.
+        As with np.cumsum, sums and products of booleans and small integers are accumulated in the default integer type.
+        """
+        values = np.asarray(values)
+        if dtype is None and operator in (np.add, np.multiply) and values.dtype.kind in 'biu':
+            #the type numpy accumulates in by default
+            dtype = np.add.accumulate(np.zeros(1, values.dtype)).dtype
+        values = np.asarray(values, dtype=dtype)
+        sorted = self._sort_values(values, axis)
+        if sorted is values:
+            sorted = sorted.copy()
+        scanned = np.moveaxis(sorted, axis, 0)
+        if operator is np.add and scanned.dtype.kind in 'biu':
+            total = np.cumsum(scanned, axis=0, dtype=scanned.dtype)
+            start = self.index.start
+            total -= np.repeat(total[start] - scanned[start], self.index.count, axis=0)
+            scanned[...] = total
+        else:
+            count = self.index.count
+            large = np.flatnonzero(count >= self.scan_block)
+            for start, stop in zip(self.index.start[large], self.index.stop[large]):
+                operator.accumulate(scanned[start:stop], axis=0, out=scanned[start:stop])
+            #the elements of small groups which have a predecessor within their group
+            position = self._position_in_group()
+            active = np.flatnonzero((position > 0) & np.repeat(count < self.scan_block, count))
+            distance = 1
+            while active.size:
+                scanned[active] = operator(scanned[active - distance], scanned[active])
+                distance *= 2
+                active = active[position[active] >= distance]
+        return self._unsort(sorted, axis)
+
+    def cumsum(self, values, axis=0, dtype=None):
+        """cumulative sum of the values within each group, in the order of the keys"""
+        return self.scan(values, np.add, axis, dtype)
+
+    def cumprod(self, values, axis=0, dtype=None):
+        """cumulative product of the values within each group, in the order of the keys"""
+        return self.scan(values, np.multiply, axis, dtype)
+
+    def cummin(self, values, axis=0):
+        """cumulative minimum of the values within each group, in the order of the keys"""
+        return self.scan(values, np.minimum, axis)
+
+    def cummax(self, values, axis=0):
+        """cumulative maximum of the values within each group, in the order of the keys"""
+        return self.scan(values, np.maximum, axis)
+
+    def cumcount(self):
+        """number of preceding keys in the group of each key
+
+        Returns
+        -------
+        ndarray, [keys], int
+            enumeration of the keys within each group, in order of occurrence
+        """
+        return self._unsort(self._position_in_group()).astype(np.intp, copy=False)
+
+    def rank(self, values, axis=0):
+        """rank of each value within its group
+
+        Parameters
+        ----------
+        values : array_like, [keys, ...]
+            values to rank per group
+        axis : int, optional
+            alternative axis for values
+
+        Returns
+        -------
+        ndarray, [keys, ...], int
+            number of values in the group of each value, that precede it in sorting order;
+            equal values are ranked in order of occurrence
+        """
+        values = np.moveaxis(np.asarray(values), axis, 0)
+        order = self._sort_within_groups(values.reshape(len(values), -1))
+        rank = np.empty(order.shape, order.dtype)
+        position = np.broadcast_to(self._position_in_group()[:, None], order.shape)
+        np.put_along_axis(rank, order, position, axis=0)
+        return np.moveaxis(rank.reshape(values.shape), 0, axis)
 
     #implement iter interface? could simply do zip( group_by(keys)(values)), no?
 
 
-def group_by(keys, values=None, reduction=None, axis=0):
+class GroupByAccumulator(object):
+    """
+    running aggregates of values over groups of keys, for keys and values which are given in chunks
+    each chunk is reduced by a GroupBy, after which its partial aggregates are merged with those of the
+    preceding chunks, keyed by the sorted unique keys seen so far.
+    accumulators of different chunks of data can be merged as well, to obtain the aggregates over all data
+
+    variances are accumulated as sums of squared deviations from the mean of each group,
+    which are combined using the pairwise update of Chan et al., to avoid loss of precision
+    """
+
+    def __init__(self):
+        self.unique = None
+        self.partials = None
+
+    def update(self, keys, values):
+        """accumulate a chunk of keys and values
+
+        Parameters
+        ----------
+        keys : indexable object
+            sequence of keys to group by
+        values : array_like, [keys, ...]
+            values to accumulate per group
+
+        Returns
+        -------
+        GroupByAccumulator
+            self
+        """
+        g = GroupBy(keys)
+        values = np.asarray(values)
+        if g.index.size == 0:
+            return self
+        unique, stats = g.aggregate(values, ['count', 'sum', 'var', 'min', 'max', 'first', 'last'])
+        count = stats['count'].reshape(g._group_shape(values.ndim))
+        partials = OrderedDict((
+            ('count', stats['count']),
+            ('sum', stats['sum']),
+            ('m2', stats['var'] * count),
+            ('min', stats['min']),
+            ('max', stats['max']),
+            ('first', stats['first']),
+            ('last', stats['last'])))
+        self._merge(unique, partials)
+        return self
+
+    def merge(self, other):
+        """accumulate the aggregates of another accumulator; its keys are taken to follow those of self
+
+        Parameters
+        ----------
+        other : GroupByAccumulator
+
+        Returns
+        -------
+        GroupByAccumulator
+            self
+        """
+        if other.unique is not None:
+            self._merge(other.unique, other.partials)
+        return self
+
+    def _merge(self, unique, partials):
+        if self.unique is None:
+            self.unique, self.partials = unique, partials
+            return
+        g = GroupBy(_concatenate(self.unique, unique))
+        part = OrderedDict((name, np.concatenate((self.partials[name], partials[name]))) for name in partials)
+        count = g.reduce(part['count'])
+        total = g.reduce(part['sum'])
+        #deviation of the mean of each part from the mean of the merged group
+        part_count = part['count'].reshape([-1] + [1] * (total.ndim - 1))
+        mean = total / count.reshape(g._group_shape(total.ndim))
+        deviation = part['sum'] / part_count - mean.take(g.index.inverse, axis=0)
+        self.unique = g.unique
+        self.partials = OrderedDict((
+            ('count', count),
+            ('sum', total),
+            ('m2', g.reduce(part['m2'] + part_count * deviation ** 2)),
+            ('min', g.reduce(part['min'], np.minimum)),
+            ('max', g.reduce(part['max'], np.maximum)),
+            ('first', g.first(part['first'])[1]),
+            ('last', g.last(part['last'])[1])))
+
+    def result(self, stats=('count', 'sum', 'mean', 'var', 'std', 'min', 'max', 'first', 'last')):
+        """compute statistics over each group from the accumulated aggregates
+
+        Parameters
+        ----------
+        stats : sequence of str, optional
+            names of the statistics to compute; any of
+            'count', 'sum', 'mean', 'var', 'std', 'min', 'max', 'first', 'last'
+
+        Returns
+        -------
+        unique: ndarray, [groups]
+            unique keys
+        reduced : OrderedDict of str to ndarray, [groups, ...]
+            value array reduced over groups, for each of the requested statistics, as returned by GroupBy.aggregate
+        """
+        if self.unique is None:
+            raise ValueError('No values have been accumulated')
+        partials = self.partials
+        count = partials['count'].reshape([-1] + [1] * (partials['sum'].ndim - 1))
+        result = OrderedDict()
+        for stat in stats:
+            if stat == 'mean':
+                result[stat] = partials['sum'] / count
+            elif stat in ('var', 'std'):
+                var = partials['m2'] / count
+                result[stat] = var if stat == 'var' else np.sqrt(var)
+            elif stat in partials and stat != 'm2':
+                result[stat] = partials[stat]
+            else:
+                raise ValueError('Unknown statistic: {}'.format(stat))
+        return self.unique, result
+
+
+#shared buffers of the worker processes of parallel_aggregate, set by the pool initializer
+_shared = {}
+
+
+def _share(array, order):
+    """copy an array, permuted along its first axis by order, into a buffer in shared memory"""
+    raw = multiprocessing.RawArray('b', max(array.nbytes, 1))
+    view = np.frombuffer(raw, array.dtype, array.size).reshape(array.shape)
+    np.take(array, order, axis=0, out=view)
+    return raw, array.dtype.str, array.shape
+
+
+def _init_worker(keys, values):
+    """pool initializer, viewing the shared buffers as arrays"""
+    def view(raw, dtype, shape):
+        return np.frombuffer(raw, np.dtype(dtype), int(np.prod(shape))).reshape(shape)
+    _shared['keys'] = view(*keys)
+    _shared['values'] = view(*values)
+
+
+def _partition_of(keys, partition, parts, splitters):
+    """assign each key to one of the given number of parts, such that identical keys share a part"""
+    if partition == 'range':
+        return np.searchsorted(splitters, keys, side='right')
+    if keys.dtype.kind == 'f':
+        keys = keys + 0     # -0.0 and 0.0 are identical keys
+    bits = keys.view('u{}'.format(keys.dtype.itemsize)).astype(np.uint64)
+    #fibonacci hashing, to spread out consecutive keys
+    return ((bits * np.uint64(0x9E3779B97F4A7C15)) >> np.uint64(32)) % np.uint64(parts)
+
+
+def _aggregate_partition(args):
+    """worker task of parallel_aggregate; aggregate the rows of a single part, which are contiguous"""
+    start, stop, stats = args
+    return GroupBy(_shared['keys'][start:stop]).aggregate(_shared['values'][start:stop], stats)
+
+
+def parallel_aggregate(keys, values, stats, n_jobs=None, partition='hash'):
+    """compute multiple statistics over each group, partitioning the keys over a pool of processes
+
+    Parameters
+    ----------
+    keys : ndarray, [keys], numeric
+        keys to group by
+    values : ndarray, [keys, ...], numeric
+        values to compute statistics of per group
+    stats : sequence of str
+        names of the statistics to compute; any of
+        'count', 'sum', 'prod', 'mean', 'var', 'std', 'min', 'max', 'first', 'last'
+    n_jobs : int, optional
+        number of worker processes; defaults to the number of cpus
+    partition : {'hash', 'range'}
+        if 'hash', rows are partitioned by a hash of their key
+        if 'range', rows are partitioned by ranges of sorted keys, with bounds taken from a sample of the keys.
+        this avoids sorting the unique keys of the parts, but balances poorly for skewed keys
+
+    Returns
+    -------
+    unique: ndarray, [groups]
+        unique keys
+    reduced : OrderedDict of str to ndarray, [groups, ...]
+        value array reduced over groups, for each of the requested statistics, as returned by GroupBy.aggregate
+
+    Notes
+    -----
+    the part of each row is computed once, after which keys and values are copied into shared memory,
+    ordered by part by a stable counting sort of the parts. each worker then reduces the contiguous rows
+    of its part with an index of its own. partitioning takes O(n) time, and each worker reads only its own rows.
+    keys other than 1-d numeric arrays are aggregated serially
+    """
+    if partition not in ('hash', 'range'):
+        raise ValueError("partition should be either 'hash' or 'range'")
+    n_jobs = n_jobs or multiprocessing.cpu_count()
+    values = np.asarray(values)
+    if not (isinstance(keys, np.ndarray) and keys.ndim == 1 and keys.dtype.kind in 'biuf') \
+            or n_jobs == 1 or len(keys) == 0:
+        return GroupBy(keys).aggregate(values, stats)
+
+    splitters = None
+    if partition == 'range':
+        sample = np.sort(keys[::max(1, len(keys) // (n_jobs * 1024))])
+        splitters = sample[np.linspace(0, len(sample), n_jobs + 1).astype(int)[1:-1]]
+    part = _partition_of(keys, partition, n_jobs, splitters).astype(np.uint16 if n_jobs <= 2**16 else np.intp)
+    #a stable sort of small integers is a radix sort
+    order = np.argsort(part, kind='stable')
+    offsets = np.concatenate(([0], np.cumsum(np.bincount(part, minlength=n_jobs))))
+    tasks = [(start, stop, stats) for start, stop in zip(offsets[:-1], offsets[1:]) if stop > start]
+    pool = multiprocessing.Pool(
+        n_jobs, initializer=_init_worker, initargs=(_share(keys, order), _share(values, order)))
+    try:
+        parts = pool.map(_aggregate_partition, tasks)
+    finally:
+        pool.close()
+        pool.join()
+
+    unique = np.concatenate([u for u, r in parts])
+    reduced = OrderedDict((stat, np.concatenate([r[stat] for u, r in parts])) for stat in stats)
+    if partition == 'hash':
+        #the unique keys of the parts are interleaved
+        order = np.argsort(unique, kind='mergesort')
+        unique = unique[order]
+        reduced = OrderedDict((stat, r[order]) for stat, r in reduced.items())
+    return unique, reduced
+
+
+def group_by(keys, values=None, reduction=None, axis=0, assume_sorted=False, compact=True):
     """construct a grouping object on the given keys, optionally performing the given reduction on the given values
 
     Parameters
@@ -588,6 +1441,10 @@ def group_by(keys, values=None, reduction=None, axis=0):
         reduction function to apply to the values in each group
     axis : int, optional
         axis to regard as the key-sequence, in case keys is multi-dimensional
+    assume_sorted : bool, optional
+        if True, the keys are assumed to be sorted already, and are not sorted again
+    compact : bool, optional
+        if False, the index holds its index arrays as intp, rather than in the narrowest integer type possible
 
     Returns
     -------
@@ -600,7 +1457,7 @@ def group_by(keys, values=None, reduction=None, axis=0):
     --------
     numpy_indexed.as_index : for information regarding the casting rules to a valid Index object
     """
-    g = GroupBy(keys, axis)
+    g = GroupBy(keys, axis, assume_sorted, compact=compact)
     if values is None:
         return g
     groups = g.split(values)
@@ -609,4 +1466,4 @@ def group_by(keys, values=None, reduction=None, axis=0):
     return [(key, reduction(group)) for key, group in zip(g.unique, groups)]
 
 
-__all__ = ['group_by']
+__all__ = ['group_by', 'GroupByAccumulator', 'parallel_aggregate']
@@ -11,9 +11,11 @@ That said, these classes can also be very useful by themselves, in those places
 do not quite cover your needs, saving your from completely reinventing the wheel.
 
 notes:
-    do we need to work more with cached properties here?
-    generally, what is necessary and significant to precompute is pretty obvious
-    but sometimes, even the sorting might not be required
+    derived properties which cost O(n) to compute, such as inverse and rank, are cached on the index;
+    this makes it cheap to reuse a single index across many operations.
+    cached arrays are read-only, since they are shared between all consumers of the index;
+    the public functions return writable copies of them, as numpy would.
+    the memory held by the cache can be inspected, capped and released; see BaseIndex.cache_info
 
     do we need to give index a stable flag?
     for grouping, stable sort is generally desirable,
@@ -21,7 +23,15 @@ notes:
 """
 from __future__ import absolute_import, division, print_function, unicode_literals
 from builtins import *
+from collections import OrderedDict
 from functools import reduce
+import copy
+import json
+import os
+import shutil
+import tempfile
+import weakref
+from multiprocessing.pool import ThreadPool
 
 from numpy_indexed.utility import *
 from numpy_indexed import semantics
@@ -32,6 +42,157 @@ __license__ = "LGPL"
 __email__ = "hoogendoorn.eelco@gmail.com"
 
 
+class cached_property(object):
+    """property whose value is computed once, and then stored in the cache of the index it belongs to"""
+
+    def __init__(self, func):
+        self.func = func
+        self.__name__ = func.__name__
+        self.__doc__ = func.__doc__
+
+    def __get__(self, instance, owner):
+        if instance is None:
+            return self
+        try:
+            return instance._cache[self.__name__]
+        except KeyError:
+            return instance._cache_store(self.__name__, self.func(instance))
+
+
+def _set_readonly(value):
+    """mark an array, or a tuple of arrays, as read-only"""
+    if isinstance(value, tuple):
+        for v in value:
+            _set_readonly(v)
+    elif isinstance(value, np.ndarray):
+        value.flags.writeable = False
+
+
+def _copy(value):
+    """writable copy of an array, or a tuple of arrays, as held by the cache of an index"""
+    if isinstance(value, tuple):
+        return tuple(_copy(v) for v in value)
+    return value.copy() if isinstance(value, np.ndarray) else value
+
+
+def _nbytes(value):
+    """number of bytes held by an array, or a tuple of arrays"""
+    if isinstance(value, tuple):
+        return sum(_nbytes(v) for v in value)
+    return getattr(value, 'nbytes', 0)
+
+
+def _concatenate(a, b):
+    """concatenate two arrays, or two tuples of array columns"""
+    if isinstance(a, tuple):
+        return tuple(_concatenate(x, y) for x, y in zip(a, b))
+    return np.concatenate((a, b))
+
+
+def _interleave(a, b, is_b):
+    """interleave two arrays, or two tuples of array columns, placing the items of b where is_b is true"""
+    if isinstance(a, tuple):
+        return tuple(_interleave(x, y, is_b) for x, y in zip(a, b))
+    out = np.empty((len(is_b),) + a.shape[1:], np.result_type(a, b))
+    out[~is_b] = a
+    out[is_b] = b
+    return out
+
+
+def _slice(a, start, stop):
+    """slice an array, or a tuple of array columns"""
+    if isinstance(a, tuple):
+        return tuple(x[start:stop] for x in a)
+    return a[start:stop]
+
+
+def _map(func, args, n_jobs=None):
+    """map func over args, using a pool of n_jobs threads if n_jobs is given"""
+    if not n_jobs or n_jobs == 1:
+        return [func(a) for a in args]
+    pool = ThreadPool(n_jobs)
+    try:
+        return pool.map(func, args)
+    finally:
+        pool.close()
+
+
+def _parallel_argsort(keys, n_jobs, stable=True):
+    """sort keys by sorting chunks of keys in parallel, and merging the sorted chunks pairwise in parallel
+    numpy releases the GIL while sorting and searching, so these chunks can be processed concurrently by threads
+
+    Parameters
+    ----------
+    keys : ndarray, [n], or tuple of ndarray, [n]
+        flat array of keys, or tuple of key columns, to be sorted as by np.lexsort
+    n_jobs : int
+        number of threads to use
+    stable : bool
+        if True, the order of equal keys is preserved
+
+    Returns
+    -------
+    sorted : ndarray, [n]
+        sorted keys; a struct array with the primary column as first field in case of a tuple of keys
+    sorter : ndarray, [n], int
+        indices which sort the keys
+    """
+    size = len(keys[0]) if isinstance(keys, tuple) else len(keys)
+    bounds = np.linspace(0, size, n_jobs + 1).astype(int)
+
+    def sort_chunk(i):
+        chunk = _slice(keys, bounds[i], bounds[i+1])
+        if isinstance(chunk, tuple):
+            sorter = np.lexsort(chunk)
+            #struct arrays compare by their first field first, and can be searched by np.searchsorted
+            sorted = as_struct_array(*[c[sorter] for c in chunk[::-1]])
+        else:
+            sorter = np.argsort(chunk, kind='mergesort' if stable else 'quicksort')
+            sorted = chunk[sorter]
+        return sorted, sorter + bounds[i]
+
+    def merge_pair(pair):
+        (a, a_sorter), (b, b_sorter) = pair
+        is_b = np.zeros(len(a) + len(b), bool)
+        is_b[np.searchsorted(a, b, side='right') + np.arange(len(b))] = True
+        return _interleave(a, b, is_b), _interleave(a_sorter, b_sorter, is_b)
+
+    runs = _map(sort_chunk, range(n_jobs), n_jobs)
+    while len(runs) > 1:
+        pairs = list(zip(runs[0::2], runs[1::2]))
+        runs = _map(merge_pair, pairs, n_jobs) + runs[len(pairs) * 2:]
+    return runs[0]
+
+
+def _sorted_flag(sorted):
+    """flag where the key changes in an array of sorted keys, or a tuple of sorted key columns"""
+    if isinstance(sorted, tuple):
+        return reduce(np.logical_or, (s[:-1] != s[1:] for s in sorted))
+    return sorted[:-1] != sorted[1:]
+
+
+def _is_sorted(keys):
+    """O(n) check whether a flat array of keys is sorted; keys which do not support comparison are assumed unsorted"""
+    if keys.dtype.kind == 'V':
+        return False
+    try:
+        return bool(np.all(keys[:-1] <= keys[1:]))
+    except TypeError:
+        return False
+
+
+def _is_lex_sorted(keys):
+    """O(n) check whether a tuple of key columns is sorted lexicographically, with the last column as primary key"""
+    ordered = np.zeros(max(len(keys[0]) - 1, 0), bool)
+    equal = np.ones_like(ordered)
+    for key in keys[::-1]:
+        if key.dtype.kind == 'V' or key.ndim > 1:
+            return False
+        ordered |= equal & (key[:-1] < key[1:])
+        equal &= key[:-1] == key[1:]
+    return bool(np.all(ordered | equal))
+
+
 class BaseIndex(object):
     """
     minimal indexing functionality
@@ -40,22 +201,97 @@ class BaseIndex(object):
     or anything that would require an indirect sort
     """
 
-    def __init__(self, keys):
+    # maximum number of bytes held by cached properties; None means unlimited
+    cache_limit = None
+    # version of the on-disk format written by save
+    format_version = 1
+    # true if the keys were found, or assumed, to be sorted already
+    presorted = False
+    # if true, index arrays use the narrowest integer type which can hold them; see compact
+    _compact = True
+
+    def __init__(self, keys, assume_sorted=False, n_jobs=None, presorted=None, compact=True):
         """
         keys is a flat array of possibly composite type
+
+        if assume_sorted is true, the keys are taken to be sorted without checking
+        if n_jobs is given, the keys are sorted in parallel, using n_jobs threads
+        presorted is the outcome of a check whether the keys are sorted, if the caller performed one already
+        if compact is false, index arrays are of type intp, rather than of the narrowest type which can hold them
         """
+        self._compact = compact
         self._keys = np.asarray(keys).flatten()
-        self.sorted = np.sort(self._keys)
-        #the slicing points of the bins to reduce over
-        if self.size == 0:
-            self.flag = np.empty(0, bool)
-            self.slices = np.empty(0, int)
+        self.presorted = assume_sorted or (_is_sorted(self._keys) if presorted is None else presorted)
+        if self.presorted:
+            self.sorted = self._keys
+        elif n_jobs:
+            self.sorted = _parallel_argsort(self._keys, n_jobs, stable=False)[0]
         else:
-            self.flag = self.sorted[:-1] != self.sorted[1:]
-            self.slices = np.concatenate((
-                [0],
-                np.flatnonzero(self.flag)+1,
-                [self.size]))
+            self.sorted = np.sort(self._keys)
+        self._set_slices(n_jobs)
+
+    def _set_slices(self, n_jobs=None):
+        """compute the slicing points of the bins to reduce over, from the sorted keys
+        if n_jobs is given, the sorted keys are processed in n_jobs chunks in parallel"""
+        size = self.size
+        if size == 0:
+            self.flag = np.empty(0, bool)
+            self.slices = np.empty(0, self._index_dtype(0))
+            return
+        bounds = np.linspace(0, size - 1, (n_jobs or 1) + 1).astype(int)
+        dtype = self._index_dtype(size)
+
+        def chunk(i):
+            lo, hi = bounds[i], bounds[i+1]
+            flag = _sorted_flag(_slice(self.sorted, lo, hi + 1))
+            return flag, (np.flatnonzero(flag) + lo + 1).astype(dtype)
+        chunks = _map(chunk, range(len(bounds) - 1), n_jobs)
+        self.flag = np.concatenate([c[0] for c in chunks])
+        self.slices = np.concatenate([np.zeros(1, dtype)] + [c[1] for c in chunks] + [np.full(1, size, dtype)])
+
+    @property
+    def compact(self):
+        """true if index arrays use the narrowest integer type which can hold them
+        this is fixed upon construction, since all arrays of an index should agree on their types"""
+        return self._compact
+
+    def _index_dtype(self, n):
+        """integer type for indices into n items; int32 where it suffices, unless compact is disabled
+        leaves room for the sum of two indices, as used in computing midpoints"""
+        return np.int32 if self.compact and n < 2**30 else np.intp
+
+    def _group_dtype(self, groups):
+        """integer type for the group ids of the given number of groups; signed, so that differences do not wrap"""
+        return np.int16 if self.compact and groups <= 2**15 else self._index_dtype(groups)
+
+    @property
+    def _cache(self):
+        """ordered mapping of property name to cached value, from least to most recently stored"""
+        return self.__dict__.setdefault('_cached', OrderedDict())
+
+    def _cache_store(self, name, value):
+        """store a computed value in the cache, evicting the oldest entries if the cache_limit requires it"""
+        nbytes = _nbytes(value)
+        if self.cache_limit is not None:
+            if nbytes > self.cache_limit:
+                return value
+            while self._cache and sum(self.cache_info.values()) + nbytes > self.cache_limit:
+                self._cache.popitem(last=False)
+        _set_readonly(value)
+        self._cache[name] = value
+        return value
+
+    @property
+    def cache_info(self):
+        """dict mapping the names of all currently cached properties to the number of bytes they hold"""
+        return OrderedDict((name, _nbytes(value)) for name, value in self._cache.items())
+
+    def clear_cache(self, *names):
+        """release the given cached properties, or all of them if no names are given"""
+        if not names:
+            self._cache.clear()
+        for name in names:
+            self._cache.pop(name, None)
 
     @property
     def keys(self):
@@ -80,7 +316,7 @@ class BaseIndex(object):
         """stop index of all bins"""
         return self.slices[1:]
 
-    @property
+    @cached_property
     def unique(self):
         """all unique keys"""
         return self.sorted[self.start]
@@ -90,16 +326,152 @@ class BaseIndex(object):
         """number of unique keys"""
         return len(self.start)
 
-    @property
+    @cached_property
     def count(self):
-        """number of times each key occurs"""
-        return np.diff(self.slices)
+        """number of times each key occurs; compact index types are reserved for internal arrays"""
+        return np.diff(self.slices).astype(np.intp, copy=False)
 
     @property
     def uniform(self):
         """returns true if each key occurs an equal number of times"""
         return not np.any(np.diff(self.count))
 
+    def _like(self, keys):
+        """construct an index of the same type and parameters as self over the given keys"""
+        return BaseIndex(keys, compact=self.compact)
+
+    def _searchsorted(self, keys, side='left'):
+        """find the insertion points of keys, in the same representation as self.sorted, into self.sorted"""
+        return np.searchsorted(self.sorted, keys, side=side)
+
+    def _merge(self, other, is_other):
+        """merge the keys of other into self, where is_other flags the positions of the keys of other in the merged sort"""
+        self._keys = _concatenate(self._keys, other._keys)
+        self.sorted = _interleave(self.sorted, other.sorted, is_other)
+        self._set_slices()
+
+    def merge(self, other):
+        """merge the keys of another index into a new index, over the concatenated keys of both
+
+        Parameters
+        ----------
+        other : Index
+            index over keys of the same kind
+
+        Returns
+        -------
+        Index
+            index of the same type as self
+
+        Notes
+        -----
+        Since both sets of keys are already sorted, only a merge of their sorted keys is required,
+        which takes O(n + m log(n)) time, rather than the O((n + m) log(n + m)) time of sorting from scratch.
+        Since the keys of self precede those of other in the merged index, stable sorting is preserved.
+        """
+        if not isinstance(other, BaseIndex):
+            raise TypeError('Can only merge with another index object')
+        if isinstance(self, Index) and not isinstance(other, Index):
+            raise TypeError('Can only merge an indirectly sorted index with another indirectly sorted index')
+        #ties are resolved in favor of self
+        insertion = self._searchsorted(other.sorted, side='right') + np.arange(other.size)
+        is_other = np.zeros(self.size + other.size, bool)
+        is_other[insertion] = True
+
+        merged = copy.copy(self)
+        merged._merge(other, is_other)
+        #the copied cache is shared with self, and does not apply to the merged index
+        merged.__dict__.pop('_cached', None)
+        return merged
+
+    def extend(self, keys):
+        """create a new index over the keys of self, extended with the given keys;
+        only the given keys need to be sorted, see merge"""
+        return self.merge(self._like(keys))
+
+    def _state(self):
+        """dict of all attributes which define the index; cached properties are not included"""
+        return dict((k, v) for k, v in self.__dict__.items() if k != '_cached')
+
+    def save(self, path):
+        """save the index to a directory, such that it can be loaded again by BaseIndex.load
+
+        Parameters
+        ----------
+        path : str
+            directory to save the index to; it is created if it does not exist
+
+        Notes
+        -----
+        each array is written to its own .npy file, so that it can be memory mapped upon loading.
+        other attributes, such as dtypes and shapes, are written to index.json
+        """
+        if not os.path.isdir(path):
+            os.makedirs(path)
+        state = {}
+        for name, value in self._state().items():
+            if isinstance(value, np.ndarray):
+                np.save(os.path.join(path, name + '.npy'), value)
+                state[name] = {'array': 1}
+            elif isinstance(value, tuple) and value and all(isinstance(v, np.ndarray) for v in value):
+                for i, v in enumerate(value):
+                    np.save(os.path.join(path, '%s.%i.npy' % (name, i)), v)
+                state[name] = {'arrays': len(value)}
+            elif isinstance(value, np.dtype):
+                state[name] = {'dtype': np.lib.format.dtype_to_descr(value)}
+            else:
+                state[name] = {'value': value.item() if isinstance(value, np.generic) else value}
+        meta = {
+            'format_version': self.format_version,
+            'class': type(self).__name__,
+            'state': state,
+        }
+        with open(os.path.join(path, 'index.json'), 'w') as f:
+            json.dump(meta, f, indent=1)
+
+    @staticmethod
+    def load(path, mmap_mode=None, allow_pickle=False):
+        """load an index saved by BaseIndex.save
+
+        Parameters
+        ----------
+        path : str
+            directory the index was saved to
+        mmap_mode : {None, 'r', 'r+', 'c'}, optional
+            if not None, arrays are memory mapped rather than read into memory; see numpy.load
+        allow_pickle : bool, optional
+            required to load indices over keys of object dtype; see numpy.load
+
+        Returns
+        -------
+        index object of the same type as was saved
+        """
+        with open(os.path.join(path, 'index.json')) as f:
+            meta = json.load(f)
+        if meta['format_version'] > BaseIndex.format_version:
+            raise ValueError('Index was saved in a newer format than this version of numpy_indexed supports')
+        cls = globals().get(meta['class'])
+        if not (isinstance(cls, type) and issubclass(cls, BaseIndex)):
+            raise ValueError('Unknown index type %s' % meta['class'])
+
+        def load_array(name):
+            return np.load(os.path.join(path, name + '.npy'), mmap_mode=mmap_mode, allow_pickle=allow_pickle)
+
+        index = cls.__new__(cls)
+        for name, value in meta['state'].items():
+            if 'array' in value:
+                value = load_array(name)
+            elif 'arrays' in value:
+                value = tuple(load_array('%s.%i' % (name, i)) for i in range(value['arrays']))
+            elif 'dtype' in value:
+                value = np.lib.format.descr_to_dtype(value['dtype'])
+            else:
+                value = value['value']
+                if isinstance(value, list):
+                    value = tuple(value)
+            setattr(index, name, value)
+        return index
+
 
 class Index(BaseIndex):
     """
@@ -109,47 +481,61 @@ class Index(BaseIndex):
     maybe it should be called argindex?
     """
 
-    def __init__(self, keys, stable):
+    def __init__(self, keys, stable, assume_sorted=False, n_jobs=None, presorted=None, compact=True):
         """
         keys is a flat array of possibly composite type
 
         if stable is true, stable sorting of the keys is used. stable sorting is required
         uf first and last properties are required
+
+        if assume_sorted is true, the keys are taken to be sorted without checking
+        if the keys are sorted, no sorting or copying of the keys is performed at all
+        presorted is the outcome of a check whether the keys are sorted, if the caller performed one already
+
+        if n_jobs is given, the keys are sorted in parallel, using n_jobs threads
+        if compact is false, index arrays are of type intp, rather than of the narrowest type which can hold them
         """
+        self._compact = compact
         self.stable  = stable
         self._keys   = np.asarray(keys)
-        #find indices which sort the keys; use mergesort for stability, so first and last give correct results
-        self.sorter = np.argsort(self._keys, kind='mergesort' if self.stable else 'quicksort')
-        #computed sorted keys
-        self.sorted = self._keys[self.sorter]
-        if self.size == 0:
-            self.flag = np.empty(0, bool)
-            self.slices = np.empty(0, int)
+        self.presorted = assume_sorted or (_is_sorted(self._keys) if presorted is None else presorted)
+        if self.presorted:
+            #the sorter is the identity permutation, which is only created if it is required
+            self.sorted = self._keys
+        elif n_jobs:
+            self.sorted, sorter = _parallel_argsort(self._keys, n_jobs, self.stable)
+            self.sorter = sorter.astype(self._index_dtype(self.size), copy=False)
         else:
-            #the slicing points of the bins to reduce over
-            self.flag   = self.sorted[:-1] != self.sorted[1:]
-            self.slices = np.concatenate((
-                [0],
-                np.flatnonzero(self.flag)+1,
-                [self.size]))
+            #find indices which sort the keys; use mergesort for stability, so first and last give correct results
+            sorter = np.argsort(self._keys, kind='mergesort' if self.stable else 'quicksort')
+            self.sorter = sorter.astype(self._index_dtype(self.size), copy=False)
+            #computed sorted keys
+            self.sorted = self._keys[self.sorter]
+        self._set_slices(n_jobs)
 
-    @property
+    @cached_property
+    def sorter(self):
+        """identity permutation, for presorted keys"""
+        return np.arange(self.size, dtype=self._index_dtype(self.size))
+
+    @cached_property
     def sorted_group_rank_per_key(self):
         """find a better name for this? enumeration of sorted keys. also used in median implementation"""
-        return np.cumsum(np.concatenate(([False], self.flag)))
+        return np.cumsum(np.concatenate(([False], self.flag)), dtype=self._group_dtype(self.groups))
 
-    @property
+    @cached_property
     def inverse(self):
         """return index array that maps unique values back to original space. unique[inverse]==keys"""
-        inv = np.empty(self.size, int)
+        inv = np.empty(self.size, self._group_dtype(self.groups))
         inv[self.sorter] = self.sorted_group_rank_per_key
         return inv
 
-    @property
+    @cached_property
     def rank(self):
         """how high in sorted list each key is. inverse permutation of sorter, such that sorted[rank]==keys"""
-        r = np.empty(self.size, int)
-        r[self.sorter] = np.arange(self.size)
+        dtype = self._index_dtype(self.size)
+        r = np.empty(self.size, dtype)
+        r[self.sorter] = np.arange(self.size, dtype=dtype)
         return r
 
     @property
@@ -158,6 +544,270 @@ class Index(BaseIndex):
         not sure of the use case, but included for backwards compatibility with np.unique"""
         return self.sorter[self.start]
 
+    def _like(self, keys):
+        return Index(keys, self.stable, compact=self.compact)
+
+    def _state(self):
+        state = super(Index, self)._state()
+        if not self.presorted:
+            #the sorter may be a lazily computed property; but it is exactly what we want to persist
+            state['sorter'] = self.sorter
+        return state
+
+    def _merge(self, other, is_other):
+        dtype = self._index_dtype(len(is_other))
+        sorter = _interleave(self.sorter.astype(dtype), other.sorter.astype(dtype) + self.size, is_other)
+        super(Index, self)._merge(other, is_other)
+        self.sorter = sorter
+        self.presorted = False
+
+
+class CountingIndex(Index):
+    """
+    index object over integer keys spanning a limited range of values
+    the unique keys and their counts follow from a bincount, in O(n + range) time,
+    rather than the O(n log(n)) time of a comparison sort
+
+    the sorter is computed by a radix sort, which is stable, and is only computed once it is required
+    """
+
+    def __init__(self, keys, lo, hi, compact=True):
+        """
+        keys is a flat array of integers, with all keys in the closed interval [lo, hi]
+        compact is as for BaseIndex
+        """
+        self._compact = compact
+        self.stable = True
+        self._keys  = np.asarray(keys)
+        self.lo     = lo
+        self.range  = hi - lo + 1
+
+        count   = np.bincount(self._offsets, minlength=self.range)
+        present = np.flatnonzero(count)
+        count   = count[present]
+        unique  = present.astype(self._keys.dtype) + self._keys.dtype.type(lo)
+        #sorted keys follow directly from the counts; no need to gather them using the sorter
+        self.sorted = np.repeat(unique, count)
+        self.slices = np.concatenate(([0], np.cumsum(count))).astype(self._index_dtype(self.size))
+        self.flag   = np.zeros(max(self.size - 1, 0), bool)
+        self.flag[self.slices[1:-1] - 1] = True
+
+    @property
+    def _offsets(self):
+        """keys as non-negative integers, relative to the smallest key"""
+        if self._keys.dtype.itemsize == 8:
+            return (self._keys - self._keys.dtype.type(self.lo)).astype(np.intp)
+        return self._keys.astype(np.intp) - self.lo
+
+    def _merge(self, other, is_other):
+        super(CountingIndex, self)._merge(other, is_other)
+        #the sorter of the merged index is already known; only update the range for consistency
+        if self.size:
+            self.lo = int(self.sorted[0])
+            self.range = int(self.sorted[-1]) - self.lo + 1
+
+    @cached_property
+    def sorter(self):
+        """stable argsort of the keys, by means of a LSD radix sort over 16 bit digits"""
+        offsets = self._offsets
+        sorter = np.argsort((offsets & 0xFFFF).astype(np.uint16), kind='stable')
+        shift = 16
+        while (self.range - 1) >> shift:
+            digits = ((offsets[sorter] >> shift) & 0xFFFF).astype(np.uint16)
+            sorter = sorter[np.argsort(digits, kind='stable')]
+            shift += 16
+        return sorter.astype(self._index_dtype(self.size), copy=False)
+
+
+def _sorted_le(x, y):
+    """returns true if scalar array x precedes, or is equal to, scalar array y in sorting order
+    unlike x <= y, this is consistent with the ordering of nans by np.sort"""
+    return np.searchsorted(y, x, side='left')[0] == 0
+
+
+def _merge_runs(a, b, out, block):
+    """merge two sorted runs into out, streaming over the runs in blocks of the given size
+
+    Parameters
+    ----------
+    a, b : tuple of ndarray
+        sorted keys and their original indices of each run; possibly memory mapped
+    out : tuple of ndarray
+        arrays to write the merged keys and indices into; possibly memory mapped
+    block : int
+        number of items to read from each run at once
+
+    Notes
+    -----
+    ties are resolved in favor of a, such that the merge is stable
+    """
+    (a_keys, a_idx), (b_keys, b_idx) = a, b
+    out_keys, out_idx = out
+    i = j = o = 0
+    while i < len(a_keys) or j < len(b_keys):
+        ka, kb = np.asarray(a_keys[i:i+block]), np.asarray(b_keys[j:j+block])
+        a_more, b_more = i + block < len(a_keys), j + block < len(b_keys)
+        #items beyond the current blocks follow the last item of their block;
+        #everything up to the smallest of those last items can be merged now
+        if a_more and (not b_more or _sorted_le(ka[-1:], kb[-1:])):
+            #items of b equal to the last item of a have to wait for equal items in the remainder of a
+            na, nb = len(ka), np.searchsorted(kb, ka[-1:], side='left')[0]
+        elif b_more:
+            na, nb = np.searchsorted(ka, kb[-1:], side='right')[0], len(kb)
+        else:
+            na, nb = len(ka), len(kb)
+        ka, kb = ka[:na], kb[:nb]
+        is_b = np.zeros(na + nb, bool)
+        is_b[np.searchsorted(ka, kb, side='right') + np.arange(nb)] = True
+        out_keys[o:o+na+nb] = _interleave(ka, kb, is_b)
+        out_idx[o:o+na+nb] = _interleave(np.asarray(a_idx[i:i+na]), np.asarray(b_idx[j:j+nb]), is_b)
+        i, j, o = i + na, j + nb, o + na + nb
+
+
+class ExternalIndex(Index):
+    """
+    index object over a flat array of keys which may not fit in memory, such as a np.memmap
+    the keys are sorted by an external merge sort: chunks of keys which fit in the memory budget
+    are sorted in memory, after which the sorted runs are merged pairwise, streaming from and to disk
+
+    the resulting sorter, sorted keys and slices are memory mapped arrays in a temporary directory,
+    which is removed by calling close, by leaving a with block over the index, or once the index is garbage collected.
+    operations over groups, such as GroupBy.reduce,
+    can stream over the index in blocks of groups spanning a bounded number of keys; see blocks
+    """
+
+    def __init__(self, keys, memory_limit, tempdir=None, compact=True):
+        """
+        keys is a flat array of keys; only chunks of it are read into memory at any time
+
+        memory_limit is the approximate number of bytes of memory to use
+        tempdir is the directory in which to create a temporary directory holding the index arrays
+        compact is as for BaseIndex
+        """
+        self._compact = compact
+        self.stable = True
+        self._keys = keys if isinstance(keys, np.ndarray) else np.asarray(keys)
+        if self._keys.ndim != 1:
+            raise ValueError('ExternalIndex requires a flat array of keys')
+        #sorting a chunk in memory requires the keys, their sorted copy, and two index arrays
+        self.block_size = max(int(memory_limit) // (2 * self._keys.dtype.itemsize + 16), 1)
+        self.path = tempfile.mkdtemp(dir=tempdir)
+        #the finalizer holds on to the path only, so it does not keep the index alive
+        self._finalizer = weakref.finalize(self, shutil.rmtree, self.path, True)
+
+        try:
+            runs = [self._sort_chunk(i) for i in range(0, self.size, self.block_size)]
+            generation = 0
+            while len(runs) > 1:
+                generation += 1
+                merged = [self._merge_pair(runs[i], runs[i+1], '%i_%i' % (generation, i)) for i in range(0, len(runs) - 1, 2)]
+                runs = merged + runs[len(merged) * 2:]
+        except:
+            self._finalizer()
+            raise
+        if runs:
+            self.sorted, self.sorter = runs[0]
+            self.slices = self._compute_slices()
+        else:
+            self.sorted, self.sorter = self._keys[:0], np.empty(0, np.intp)
+            self.slices = np.empty(0, int)
+
+    def _sort_chunk(self, start):
+        """sort a chunk of keys in memory, and write it to disk as a sorted run"""
+        keys = np.asarray(self._keys[start:start+self.block_size])
+        sorter = np.argsort(keys, kind='mergesort')
+        path = os.path.join(self.path, 'run_0_%i' % start)
+        run = (
+            np.lib.format.open_memmap(path + '_keys.npy', mode='w+', dtype=keys.dtype, shape=keys.shape),
+            np.lib.format.open_memmap(path + '_sorter.npy', mode='w+', dtype=np.intp, shape=keys.shape))
+        run[0][:] = keys[sorter]
+        run[1][:] = sorter + start
+        return run
+
+    def _merge_pair(self, a, b, name):
+        """merge two runs into a new run, and remove the files of the old runs"""
+        path = os.path.join(self.path, 'run_' + name)
+        size = len(a[0]) + len(b[0])
+        run = (
+            np.lib.format.open_memmap(path + '_keys.npy', mode='w+', dtype=a[0].dtype, shape=(size,)),
+            np.lib.format.open_memmap(path + '_sorter.npy', mode='w+', dtype=np.intp, shape=(size,)))
+        #merging holds two blocks of input and the merged output in memory
+        _merge_runs(a, b, run, max(self.block_size // 4, 1))
+        for array in a + b:
+            os.remove(array.filename)
+        return run
+
+    def _compute_slices(self):
+        """stream over the sorted keys, and write the slicing points of the groups to disk"""
+        filename = os.path.join(self.path, 'slices.bin')
+        with open(filename, 'wb') as f:
+            f.write(np.zeros(1, np.intp).tobytes())
+            for start in range(0, self.size, self.block_size):
+                #include the last key of the previous block, to detect a boundary between blocks
+                offset = max(start - 1, 0)
+                keys = np.asarray(self.sorted[offset:start+self.block_size])
+                f.write((np.flatnonzero(keys[:-1] != keys[1:]) + offset + 1).astype(np.intp).tobytes())
+            f.write(np.array([self.size], np.intp).tobytes())
+        return np.memmap(filename, dtype=np.intp, mode='r')
+
+    @property
+    def size(self):
+        return len(self._keys)
+
+    @cached_property
+    def sorted_group_rank_per_key(self):
+        return np.repeat(np.arange(self.groups, dtype=self._group_dtype(self.groups)), self.count)
+
+    def blocks(self):
+        """iterate over ranges of groups, such that each range spans at most block_size keys,
+        unless a single group is larger than that
+
+        Yields
+        ------
+        tuple of int
+            first and one-past-last group of each range
+        """
+        g = 0
+        while g < self.groups:
+            end = np.searchsorted(self.slices, self.slices[g] + self.block_size, side='right') - 1
+            end = min(max(end, g + 1), self.groups)
+            yield g, end
+            g = end
+
+    def close(self):
+        """release the arrays of this index, and remove the temporary directory holding them
+        an index loaded by BaseIndex.load does not own a temporary directory, so nothing is removed from disk"""
+        self.sorted = self.sorter = self.slices = None
+        self.clear_cache()
+        #only the finalizer of the index which created the directory may remove it
+        finalizer = self.__dict__.get('_finalizer')
+        if finalizer is not None:
+            finalizer()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+    def _state(self):
+        state = super(ExternalIndex, self)._state()
+        #the temporary directory belongs to this instance; a saved copy holds its arrays in its own directory
+        state.pop('_finalizer', None)
+        state.pop('path', None)
+        return state
+
+
+def _counting_range(keys):
+    """returns the (lo, hi) range of the given keys if a counting sort is preferable over a comparison sort
+    this is the case for integer keys, spanning a range of values not much bigger than the number of keys"""
+    if keys.ndim != 1 or keys.dtype.kind not in 'biu' or keys.size == 0:
+        return None
+    lo, hi = int(keys.min()), int(keys.max())
+    if hi - lo < 2 * keys.size:
+        return lo, hi
+    return None
+
 
 class ObjectIndex(Index):
     """
@@ -170,7 +820,7 @@ class ObjectIndex(Index):
     not sure what is more readable though
     """
 
-    def __init__(self, keys, axis, stable):
+    def __init__(self, keys, axis, stable, assume_sorted=False, n_jobs=None, compact=True):
         self.axis = axis
         self.dtype = keys.dtype
 
@@ -178,7 +828,7 @@ class ObjectIndex(Index):
         self.shape = keys.shape
         keys = array_as_object(keys)
 
-        super(ObjectIndex, self).__init__(keys, stable)
+        super(ObjectIndex, self).__init__(keys, stable, assume_sorted, n_jobs, compact=compact)
 
     @property
     def keys(self):
@@ -190,11 +840,175 @@ class ObjectIndex(Index):
         sorted_keys = array_as_typed(self.sorted, self.dtype, self.shape)
         return np.swapaxes(sorted_keys, self.axis, 0)
 
-    @property
+    @cached_property
     def unique(self):
         """the first entry of each bin is a unique key"""
         return self.sorted_keys.take(self.start, self.axis)
 
+    def _like(self, keys):
+        return ObjectIndex(np.asarray(keys), self.axis, self.stable, compact=self.compact)
+
+    def _merge(self, other, is_other):
+        if other.dtype != self.dtype or other.shape[1:] != self.shape[1:]:
+            raise ValueError('Can only merge object indices over keys of the same dtype and shape')
+        super(ObjectIndex, self)._merge(other, is_other)
+        self.shape = (self.size,) + self.shape[1:]
+
+
+def _is_orderable(dtype):
+    """returns true if the given dtype can be mapped to an unsigned integer type by _as_orderable"""
+    return dtype.kind in 'biuf' and dtype.itemsize <= 8 and dtype.isnative
+
+
+def _as_orderable(column):
+    """map a column of numeric keys to unsigned integers of the same size,
+    such that the integers compare equal if and only if the keys are bitwise equal,
+    and are ordered as the keys are ordered; negative zero precedes zero, and nans are sorted by their sign"""
+    kind = column.dtype.kind
+    unsigned = np.dtype('u%i' % column.dtype.itemsize)
+    if kind == 'u':
+        return column
+    if kind == 'b':
+        return column.view(unsigned)
+    sign = unsigned.type(1 << (8 * unsigned.itemsize - 1))
+    bits = column.view(unsigned)
+    if kind == 'i':
+        return bits ^ sign
+    #negative floats are ordered by decreasing magnitude, positive floats by increasing magnitude
+    return np.where(bits & sign, ~bits, bits | sign)
+
+
+def _from_orderable(column, dtype):
+    """inverse of _as_orderable"""
+    kind = dtype.kind
+    if kind == 'u':
+        return column
+    if kind == 'b':
+        return column.view(dtype)
+    sign = column.dtype.type(1 << (8 * column.dtype.itemsize - 1))
+    if kind == 'i':
+        return (column ^ sign).view(dtype)
+    return np.where(column & sign, column ^ sign, ~column).view(dtype)
+
+
+def _rank_lexsort(columns, stable=True, n_jobs=None):
+    """indirect lexicographic sort of a sequence of unsigned integer columns, with the first column as primary key
+
+    columns are offset by their minimum, and packed into uint64 keys, preceded by the dense rank of the rows
+    according to the columns sorted by so far. as many bits of the columns as fit in 64 bits are packed at a time,
+    such that a few sorts of packed keys replace a lexsort over all columns;
+    a single sort suffices if the values of all columns span a limited range,
+    or if the rows are all distinct after sorting by their leading columns
+
+    Returns
+    -------
+    sorter : ndarray, [n], int
+        indices which sort the rows
+    flag : ndarray, [n-1], bool
+        true where the sorted rows change
+    """
+    size = len(columns[0])
+    columns = list(columns)
+    rank, rank_bits = None, 0
+    while columns:
+        packed, bits = rank, rank_bits
+        while columns and bits < 64:
+            lo = columns[0].min()
+            offset = (columns[0] - lo).astype(np.uint64)
+            width = int(columns[0].max() - lo).bit_length()
+            if bits + width > 64:
+                #pack the leading bits of the column, and leave its remaining bits for the next round
+                rest = width - (64 - bits)
+                columns[0] = offset & np.uint64((1 << rest) - 1)
+                offset >>= np.uint64(rest)
+                width -= rest
+            else:
+                columns.pop(0)
+            packed = offset if packed is None else (packed << np.uint64(width)) | offset
+            bits += width
+        if n_jobs:
+            sorted, sorter = _parallel_argsort(packed, n_jobs, stable)
+        else:
+            sorter = np.argsort(packed, kind='stable' if stable else 'quicksort')
+            sorted = packed[sorter]
+        flag = _sorted_flag(sorted)
+        if flag.all():
+            #all rows are distinct already, and the remaining columns can not change their order
+            break
+        if columns:
+            rank = np.empty(size, np.uint64)
+            rank[sorter] = np.cumsum(np.concatenate(([0], flag)), dtype=np.uint64)
+            rank_bits = int(rank.max()).bit_length()
+    return sorter, flag
+
+
+class RowIndex(ObjectIndex):
+    """
+    index object over nd-arrays of numeric keys, which are compared row by row, as by ObjectIndex,
+    but without casting rows to void objects which are sorted by bytewise comparison
+
+    instead, the values are mapped to unsigned integers which preserve bitwise equality and ordering,
+    and the rows are sorted by packing their columns into as few uint64 keys as possible, see _rank_lexsort.
+    the keys are stored as a struct array of these unsigned columns, which supports searching and comparison,
+    and the unique keys are sorted lexicographically, with the first column as primary key
+    """
+
+    def __init__(self, keys, axis, stable, assume_sorted=False, n_jobs=None, compact=True):
+        self._compact = compact
+        self.axis = axis
+        self.dtype = keys.dtype
+        self.stable = stable
+
+        keys = np.swapaxes(keys, axis, 0)
+        self.shape = keys.shape
+        rows = _as_orderable(np.ascontiguousarray(keys.reshape(len(keys), -1)))
+        self._keys = rows.view([('f%i' % i, rows.dtype) for i in range(rows.shape[1])]).reshape(-1)
+
+        self.presorted = assume_sorted
+        if self.presorted:
+            self.sorted = self._keys
+            self._set_slices(n_jobs)
+        else:
+            self.sorter, self.flag = _rank_lexsort(rows.T, stable, n_jobs)
+            self.sorter = self.sorter.astype(self._index_dtype(self.size), copy=False)
+            self.slices = np.concatenate((
+                [0],
+                np.flatnonzero(self.flag) + 1,
+                [self.size])).astype(self._index_dtype(self.size))
+
+    @cached_property
+    def sorted(self):
+        """sorted keys; only gathered if they are required"""
+        return self._take(self.sorter)
+
+    def _rows(self, keys):
+        """view a struct array of keys as a 2d array of unsigned integers"""
+        return keys.view(keys.dtype[0]).reshape(len(keys), -1)
+
+    def _take(self, indices):
+        """gather the given keys; gathering rows of a 2d array is faster than gathering structs"""
+        return self._rows(self._keys)[indices].view(self._keys.dtype).reshape(-1)
+
+    def _as_typed(self, keys):
+        """convert a struct array of unsigned columns back to an nd-array of the original layout"""
+        rows = _from_orderable(self._rows(keys), self.dtype)
+        return np.swapaxes(rows.reshape((len(keys),) + self.shape[1:]), self.axis, 0)
+
+    @property
+    def keys(self):
+        return self._as_typed(self._keys)
+
+    @property
+    def sorted_keys(self):
+        return self._as_typed(self.sorted)
+
+    @cached_property
+    def unique(self):
+        """the first entry of each bin is a unique key"""
+        return self._as_typed(self._take(self.sorter[self.start]))
+
+    def _like(self, keys):
+        return RowIndex(np.asarray(keys), self.axis, self.stable, compact=self.compact)
 
 class LexIndex(Index):
     """
@@ -211,28 +1025,29 @@ class LexIndex(Index):
     customization of column layout will have to be done at the call site
     """
 
-    def __init__(self, keys, stable):
+    def __init__(self, keys, stable, assume_sorted=False, n_jobs=None, compact=True):
+        self._compact = compact
+        self.stable  = stable
         self._keys   = tuple(np.asarray(key) for key in keys)
 
         keyviews    = tuple(array_as_object(key) if key.ndim>1 else key for key in self._keys)
-        #find indices which sort the keys; complex keys which lexsort does not accept are bootstrapped from Index
-        self.sorter = np.lexsort(tuple(Index(key, stable).inverse if key.dtype.kind == 'V' else key for key in keyviews))
-        #computed sorted keys
-        self.sorted = self.take(keyviews, self.sorter)
-        #the slicing points of the bins to reduce over
-        if self.size == 0:
-            self.flag = np.empty(0, bool)
-            self.slices = np.empty(0, int)
+        self.presorted = assume_sorted or _is_lex_sorted(keyviews)
+        if self.presorted:
+            self.sorted = keyviews
         else:
-            self.flag   = reduce(
-                np.logical_or,
-                (s[:-1] != s[1:] for s in self.sorted))
-            self.slices = np.concatenate((
-                [0],
-                np.flatnonzero(self.flag)+1,
-                [self.size]))
+            #complex keys which lexsort does not accept are bootstrapped from Index
+            lexkeys = tuple(Index(key, stable).inverse if key.dtype.kind == 'V' else key for key in keyviews)
+            #find indices which sort the keys
+            if n_jobs:
+                sorter = _parallel_argsort(lexkeys, n_jobs, stable)[1]
+            else:
+                sorter = np.lexsort(lexkeys)
+            self.sorter = sorter.astype(self._index_dtype(self.size), copy=False)
+            #computed sorted keys
+            self.sorted = self.take(keyviews, self.sorter)
+        self._set_slices(n_jobs)
 
-    @property
+    @cached_property
     def unique(self):
         """returns a tuple of unique key columns"""
         return tuple(
@@ -241,14 +1056,105 @@ class LexIndex(Index):
 
     @property
     def size(self):
-        return self.sorter.size
+        return len(self._keys[0])
 
     def take(self, keys, indices):
         return tuple(key[indices] for key in keys)
 
-    def concatenate(self, *others):
-        return
+    def _like(self, keys):
+        return LexIndex(keys, self.stable, compact=self.compact)
+
+    def _searchsorted(self, keys, side='left'):
+        """lexsort sorts by the last key column first, whereas struct arrays are compared by their first field first"""
+        dtypes = [np.result_type(s, k) for s, k in zip(self.sorted, keys)]
+        sorted = as_struct_array(*[s.astype(d, copy=False) for s, d in zip(self.sorted, dtypes)][::-1])
+        keys = as_struct_array(*[k.astype(d, copy=False) for k, d in zip(keys, dtypes)][::-1])
+        return np.searchsorted(sorted, keys, side=side)
+
 
+def _packed_ranges(keys):
+    """returns the (lo, hi) range of each of a tuple of key columns, if they can be packed into a single uint64
+    this is the case for 1-d integer columns, whose ranges together span at most 64 bits"""
+    keys = tuple(np.asarray(key) for key in keys)
+    if any(key.ndim != 1 or key.dtype.kind not in 'biu' for key in keys):
+        return None
+    if keys[0].size == 0 or any(key.size != keys[0].size for key in keys):
+        return None
+    ranges = tuple((int(key.min()), int(key.max())) for key in keys)
+    if sum((hi - lo).bit_length() for lo, hi in ranges) > 64:
+        return None
+    return ranges
+
+
+class PackedLexIndex(LexIndex):
+    """
+    index object over a tuple of 1-d integer key columns, whose ranges together span at most 64 bits
+    the columns are bit-packed into a single uint64 key, with the last column in the most significant bits,
+    such that sorting the packed keys is equivalent to a lexsort of the columns, yet requires only a single sort,
+    which may in turn be a counting sort, if the packed keys span a limited range
+
+    the sorted key columns are unpacked from the sorted packed keys, rather than gathered column by column
+    """
+
+    def __init__(self, keys, stable, ranges, assume_sorted=False, n_jobs=None, compact=True):
+        """
+        ranges is a tuple of (lo, hi) bounds of each key column, as returned by _packed_ranges
+        """
+        self._compact = compact
+        self.stable = stable
+        self._keys  = tuple(np.asarray(key) for key in keys)
+        self.lo     = tuple(lo for lo, hi in ranges)
+        self.bits   = tuple((hi - lo).bit_length() for lo, hi in ranges)
+
+        packed = as_index(self.pack(self._keys), stable=stable, assume_sorted=assume_sorted, n_jobs=n_jobs, compact=compact)
+        self.presorted = packed.presorted
+        self._packed = packed
+        self.sorted = self.unpack(packed.sorted)
+        self.flag   = packed.flag
+        self.slices = packed.slices
+
+    @cached_property
+    def sorter(self):
+        """sorter of the packed keys; a counting index over the packed keys computes it only once it is required"""
+        if self.presorted:
+            #the identity permutation, as for Index; a loaded index does not hold on to the packed index
+            return np.arange(self.size, dtype=self._index_dtype(self.size))
+        return self._packed.sorter
+
+    def _state(self):
+        state = super(PackedLexIndex, self)._state()
+        #the index over the packed keys is only held on to for its sorter, which is persisted itself
+        state.pop('_packed', None)
+        return state
+
+    def pack(self, keys):
+        """pack a tuple of key columns into a single array of uint64 keys"""
+        packed = np.zeros(len(keys[0]), np.uint64)
+        shift = 0
+        for key, lo, bits in zip(keys, self.lo, self.bits):
+            if bits:
+                key = key.astype(np.uint64 if key.dtype.kind == 'u' else np.int64)
+                #offsets may overflow the signed type, but are correct modulo 2**64
+                offset = (key - key.dtype.type(lo)).view(np.uint64)
+                packed |= offset << np.uint64(shift)
+            shift += bits
+        return packed
+
+    def unpack(self, packed):
+        """unpack an array of uint64 keys into a tuple of key columns"""
+        columns = []
+        shift = 0
+        for key, lo, bits in zip(self._keys, self.lo, self.bits):
+            if bits:
+                offset = (packed >> np.uint64(shift)) & np.uint64((1 << bits) - 1)
+                if key.dtype.kind != 'u':
+                    offset = offset.view(np.int64)
+                column = (offset + offset.dtype.type(lo)).astype(key.dtype)
+            else:
+                column = np.full(len(packed), lo, key.dtype)
+            columns.append(column)
+            shift += bits
+        return tuple(columns)
 
 
 class LexIndexSimple(Index):
@@ -275,7 +1181,7 @@ class LexIndexSimple(Index):
                 np.flatnonzero(self.flag)+1,
                 [self.size]))
 
-    @property
+    @cached_property
     def unique(self):
         """the first entry of each bin is a unique key"""
         return tuple(s[self.start] for s in self.sorted)
@@ -285,10 +1191,422 @@ class LexIndexSimple(Index):
         return self.sorter.size
 
 
-def as_index(keys, axis=semantics.axis_default, base=False, stable=True, lex_as_struct=False):
+def _mix(h):
+    """finalization step of the murmur3 hash; scrambles the bits of an array of uint64 in place"""
+    h ^= h >> np.uint64(33)
+    h *= np.uint64(0xff51afd7ed558ccd)
+    h ^= h >> np.uint64(33)
+    h *= np.uint64(0xc4ceb9fe1a85ec53)
+    h ^= h >> np.uint64(33)
+    return h
+
+
+def _canonical_float(keys):
+    """map -0.0 to +0.0, and all nans to a single nan, so that equal keys, as matched by _equal, hash equal"""
+    return np.where(np.isnan(keys), keys.dtype.type(np.nan), keys + keys.dtype.type(0))
+
+
+def _equal(a, b):
+    """elementwise equality of two flat arrays of keys, as used for hashing
+    nans equal each other, as they do when searching sorted keys; struct keys are compared field by field"""
+    if a.dtype.names:
+        fields = (_equal(a[name], b[name]).reshape(len(a), -1).all(axis=1) for name in a.dtype.names)
+        return reduce(np.logical_and, fields, np.ones(len(a), bool))
+    equal = a == b
+    if a.dtype.kind in 'fc':
+        equal |= np.isnan(a) & np.isnan(b)
+    return equal
+
+
+def _hash(keys):
+    """compute a uint64 hash of each key in a flat array of keys
+    numeric keys are hashed by value, other keys by their bytes"""
+    if keys.dtype.hasobject:
+        raise ValueError('Only keys of a fixed size dtype can be hashed; got keys of dtype {}'.format(keys.dtype))
+    if keys.dtype.kind in 'biuf' and keys.dtype.itemsize <= 8:
+        if keys.dtype.kind == 'f':
+            keys = _canonical_float(keys)
+        return _mix(keys.view('u%i' % keys.dtype.itemsize).astype(np.uint64))
+    floats = [name for name in keys.dtype.names or () if keys.dtype[name].base.kind == 'f']
+    if floats:
+        #struct keys are matched field by field, so float fields are normalized as above
+        keys = keys.copy()
+        for name in floats:
+            keys[name] = _canonical_float(keys[name])
+    keys = np.ascontiguousarray(keys)
+    nbytes = keys.dtype.itemsize
+    words = keys.view(np.uint8).reshape(len(keys), nbytes)
+    if nbytes % 8:
+        words = np.concatenate((words, np.zeros((len(keys), 8 - nbytes % 8), np.uint8)), axis=1)
+    words = words.view(np.uint64)
+    h = np.zeros(len(keys), np.uint64)
+    for i in range(words.shape[1]):
+        h = _mix(h ^ words[:, i])
+    return h
+
+
+class HashIndex(BaseIndex):
+    """
+    index object based on a vectorized open addressing hash table
+    provides unique, count and membership tests in expected O(n) time, by avoiding a sort altogether
+    as a consequence, the unique keys are not sorted, unless explicitly requested
+
+    keys can be 1-d arrays of any fixed size dtype, or nd-arrays, in which case
+    the given axis enumerates the keys, and groups are formed on the basis of bitwise equality, as in ObjectIndex
+    keys of object dtype are rejected with a ValueError. all nans form a single group
+    """
+
+    def __init__(self, keys, axis=0, sort=False, lex=False):
+        """
+        if sort is true, the unique keys are returned in sorted order
+        if lex is true, the keys are a struct array formed from a tuple of key columns,
+        and the unique keys are returned as a tuple of columns
+        """
+        keys = np.asarray(keys)
+        self.axis = axis
+        self.dtype = keys.dtype
+        self.sort = sort
+        self.lex = lex
+        if keys.ndim > 1:
+            keys = np.swapaxes(keys, axis, 0)
+            self.shape = keys.shape
+            keys = array_as_object(keys)
+        self._keys = keys
+
+        #table size is a power of two, with a load factor of at most two thirds
+        dtype = np.int32 if self.size < 2**31 else np.intp
+        self.table = np.full(1 << int(3 * self.size // 2).bit_length(), -1, dtype)
+        self.slot = self._probe(self._keys, insert=True)
+
+    def _probe(self, keys, insert):
+        """find the slot in the table of each of the given keys, by means of linear probing
+        if insert is true, keys which are not yet present claim an empty slot
+        otherwise, the slot of keys which are not present is -1"""
+        mask = len(self.table) - 1
+        slot = (_hash(keys) & np.uint64(mask)).astype(np.intp)
+        pending = np.arange(len(keys))
+        while pending.size:
+            s = slot[pending]
+            owner = self.table[s]
+            empty = np.flatnonzero(owner == -1)
+            if insert:
+                #where multiple keys compete for the same empty slot, one of them wins
+                self.table[s[empty]] = pending[empty]
+                owner[empty] = self.table[s[empty]]
+                #keys which claimed a slot are done; others need to compare against the owner of the slot
+                found = owner == pending
+                compare = np.flatnonzero(~found)
+            else:
+                slot[pending[empty]] = -1
+                found = np.zeros(len(pending), bool)
+                found[empty] = True
+                compare = np.flatnonzero(~found)
+            found[compare] = _equal(self._keys[owner[compare]], keys[pending[compare]])
+            if not insert:
+                slot[pending[compare[found[compare]]]] = s[compare[found[compare]]]
+            pending = pending[~found]
+            slot[pending] = (slot[pending] + 1) & mask
+        return slot
+
+    @cached_property
+    def representatives(self):
+        """index of a key representing each group, such that keys[representatives]==unique"""
+        representatives = self.table[self.table != -1]
+        if self.sort:
+            representatives = representatives[np.argsort(self._keys[representatives], kind='mergesort')]
+        return representatives
+
+    @cached_property
+    def _group(self):
+        """group index of each slot in the table; -1 for empty slots"""
+        group = np.full(len(self.table), -1, self.table.dtype)
+        group[self.slot[self.representatives]] = np.arange(self.groups)
+        return group
+
+    def lookup(self, keys):
+        """find the group index of each of the given keys; -1 for keys which are not present
+
+        Parameters
+        ----------
+        keys : indexable object
+            key objects of the same layout as the keys of this index
+
+        Returns
+        -------
+        ndarray, [n], int
+            group index of each key, such that unique[group]==keys, for keys that are present
+        """
+        if isinstance(keys, BaseIndex):
+            keys = keys.keys
+        if isinstance(keys, tuple):
+            keys = as_struct_array(*keys)
+        keys = np.asarray(keys)
+        if self.axis is None:
+            keys = keys.flatten()
+        if keys.ndim > 1:
+            keys = np.swapaxes(keys, self.axis, 0)
+        if keys.dtype != self.dtype:
+            #keys which do not survive the cast to the dtype of the index can not be present in it
+            cast = keys.astype(self.dtype)
+            exact = (cast == keys).reshape(len(keys), -1).all(axis=1)
+            keys = cast
+        else:
+            exact = True
+        if keys.ndim > 1:
+            keys = array_as_object(keys)
+        if self.size == 0:
+            return np.full(len(keys), -1, np.intp)
+        slot = self._probe(keys, insert=False)
+        return np.where((slot != -1) & exact, self._group[slot], -1)
+
+    @property
+    def size(self):
+        return self._keys.size
+
+    @property
+    def groups(self):
+        return len(self.representatives)
+
+    @cached_property
+    def inverse(self):
+        """return index array that maps unique values back to original space. unique[inverse]==keys"""
+        return self._group[self.slot]
+
+    @cached_property
+    def index(self):
+        """index of the first occurrence of each unique key, such that keys[index]==unique"""
+        index = np.full(self.groups, self.size, np.intp)
+        np.minimum.at(index, self.inverse, np.arange(self.size))
+        return index
+
+    @cached_property
+    def count(self):
+        """number of times each key occurs"""
+        return np.bincount(self.inverse, minlength=self.groups)
+
+    @cached_property
+    def unique(self):
+        """all unique keys"""
+        unique = self._keys[self.representatives]
+        if self._keys.ndim == 1 and hasattr(self, 'shape'):
+            unique = np.swapaxes(array_as_typed(unique, self.dtype, (self.groups,) + self.shape[1:]), self.axis, 0)
+        if self.lex:
+            unique = tuple(unique[name] for name in unique.dtype.names)
+        return unique
+
+    @property
+    def keys(self):
+        if hasattr(self, 'shape'):
+            return np.swapaxes(array_as_typed(self._keys, self.dtype, self.shape), self.axis, 0)
+        return self._keys
+
+    @property
+    def uniform(self):
+        """returns true if each key occurs an equal number of times"""
+        return not np.any(np.diff(self.count))
+
+    def merge(self, other):
+        raise TypeError('Can only merge indices over sorted keys; a hash index does not sort its keys')
+
+
+class DictionaryIndex(Index):
+    """
+    index object over a flat array of strings or other objects, by means of dictionary encoding
+    the keys are factorized into integer codes into a sorted dictionary of unique keys, using a hash table,
+    after which all further work is done on the codes, which are sorted by a counting sort;
+    this avoids comparison sorting of the keys themselves, which is slow and memory intensive for strings
+
+    the codes are ranks into the sorted dictionary, such that the codes sort as the keys do
+    and the unique keys are the dictionary itself
+    """
+
+    def __init__(self, keys, codes=None, dictionary=None, compact=True):
+        """
+        keys is a flat array of strings or hashable objects
+
+        if codes and a sorted dictionary are given, such that dictionary[codes]==keys,
+        and all entries of the dictionary occur in the keys, factorization of the keys is skipped
+        compact is as for BaseIndex
+        """
+        self._compact = compact
+        self.stable = True
+        self._keys = np.asarray(keys)
+        if codes is None:
+            codes, dictionary = self._factorize(self._keys)
+            order = np.argsort(dictionary, kind='mergesort')
+            rank = np.empty(len(order), self._group_dtype(len(order)))
+            rank[order] = np.arange(len(order))
+            codes, dictionary = rank[codes], dictionary[order]
+        self.codes = codes
+        self.dictionary = dictionary
+
+        index = as_index(self.codes, compact=compact)
+        self.presorted = index.presorted
+        self._codes_index = index
+        self.flag = index.flag
+        self.slices = index.slices
+
+    @staticmethod
+    def _factorize(keys):
+        """returns codes into a dictionary of unique keys, in order of first appearance for object keys"""
+        if keys.dtype.kind == 'O':
+            table = {}
+            codes = np.fromiter((table.setdefault(k, len(table)) for k in keys), np.intp, len(keys))
+            dictionary = np.empty(len(table), object)
+            for i, k in enumerate(table):
+                dictionary[i] = k
+            return codes, dictionary
+        index = HashIndex(keys)
+        return index.inverse, index.unique
+
+    @cached_property
+    def sorter(self):
+        """stable argsort of the keys, by means of a counting sort of their codes"""
+        if self.presorted:
+            #the identity permutation, as for Index; a loaded index does not hold on to the index over the codes
+            return np.arange(self.size, dtype=self._index_dtype(self.size))
+        return self._codes_index.sorter
+
+    def _state(self):
+        state = super(DictionaryIndex, self)._state()
+        #the index over the codes is only held on to for its sorter, which is persisted itself
+        state.pop('_codes_index', None)
+        return state
+
+    @cached_property
+    def sorted(self):
+        """sorted keys; only materialized if they are required"""
+        return np.repeat(self.dictionary, self.count)
+
+    @cached_property
+    def unique(self):
+        """all unique keys"""
+        return self.dictionary
+
+    @cached_property
+    def inverse(self):
+        """return index array that maps unique values back to original space. unique[inverse]==keys"""
+        return self.codes
+
+    def encode(self, keys):
+        """find the codes of the given keys in the dictionary of this index
+
+        Parameters
+        ----------
+        keys : ndarray, [n], or BaseIndex
+            keys to encode; the dictionary of a DictionaryIndex is encoded only once
+
+        Returns
+        -------
+        ndarray, [n], int
+            codes of the keys, such that dictionary[codes]==keys; -1 for keys not in the dictionary
+        """
+        if isinstance(keys, DictionaryIndex):
+            return self.encode(keys.dictionary)[keys.codes]
+        if isinstance(keys, BaseIndex):
+            keys = keys._keys
+        keys = np.asarray(keys)
+        if len(self.dictionary) == 0:
+            return np.full(len(keys), -1, np.intp)
+        codes = np.searchsorted(self.dictionary, keys)
+        found = self.dictionary[np.minimum(codes, len(self.dictionary) - 1)] == keys
+        return np.where(found & (codes < len(self.dictionary)), codes, -1)
+
+    def _like(self, keys):
+        return DictionaryIndex(keys, compact=self.compact)
+
+    def merge(self, other):
+        """create a new index over the keys of self, followed by those of other
+        only the dictionaries need to be merged, after which the codes are translated and counted"""
+        if not isinstance(other, BaseIndex):
+            raise TypeError('Can only merge with another index object')
+        if not isinstance(other, DictionaryIndex):
+            other = DictionaryIndex(other.keys, compact=self.compact)
+        dictionary = np.unique(np.concatenate((self.dictionary, other.dictionary)))
+        codes = np.concatenate((
+            np.searchsorted(dictionary, self.dictionary)[self.codes],
+            np.searchsorted(dictionary, other.dictionary)[other.codes]))
+        return DictionaryIndex(
+            np.concatenate((self._keys, other._keys)),
+            codes.astype(self._group_dtype(len(dictionary))),
+            dictionary,
+            compact=self.compact)
+
+
+class Categorical(object):
+    """
+    keys factorized into integer codes and their unique values, to be reused across calls
+    a Categorical can be passed as keys to any function accepting keys, which then all share the same index;
+    the index is constructed lazily, as a basic index if that is all that is required at first,
+    and is upgraded to a full index at most once
+    """
+
+    def __init__(self, keys, axis=semantics.axis_default, **kwargs):
+        """
+        keys is any indexable object, and axis and any further keyword arguments are as for as_index
+        """
+        self.axis = axis
+        self.kwargs = kwargs
+        self._keys = keys
+        self._index = keys if isinstance(keys, BaseIndex) else None
+        #index over tuple keys compared as structs, as used by the set functions
+        self._struct_index = None
+
+    def as_index(self, base=False, lex_as_struct=False):
+        """return the index over the keys; a basic index suffices if base is true, see as_index
+        if lex_as_struct is true, tuple keys are indexed as structs, which is likewise only done once"""
+        if self._index is None or not (base or isinstance(self._index, Index)):
+            keys = self._keys if self._index is None else self._index.keys
+            self._index = as_index(keys, self.axis, base=base, **self.kwargs)
+            #the index holds the keys from here on
+            self._keys = None
+        if lex_as_struct and isinstance(self._index.keys, tuple):
+            if self._struct_index is None or not (base or isinstance(self._struct_index, Index)):
+                kwargs = dict(self.kwargs, lex_as_struct=True)
+                self._struct_index = as_index(self._index, self.axis, base=base, **kwargs)
+            return self._struct_index
+        return self._index
+
+    @property
+    def index(self):
+        """full index over the keys"""
+        return self.as_index()
+
+    @property
+    def codes(self):
+        """code of each key, such that uniques[codes]==keys"""
+        return self.index.inverse.astype(np.intp)
+
+    @property
+    def uniques(self):
+        """sorted unique keys"""
+        return _copy(self.as_index(base=True).unique)
+
+    @property
+    def count(self):
+        """number of times each unique key occurs"""
+        return _copy(self.as_index(base=True).count)
+
+    @property
+    def groups(self):
+        """number of unique keys"""
+        return self.as_index(base=True).groups
+
+    @property
+    def keys(self):
+        return self.as_index(base=True).keys
+
+    def __len__(self):
+        return self.as_index(base=True).size
+
+
+def as_index(keys, axis=semantics.axis_default, base=False, stable=True, lex_as_struct=False, method=None,
+             assume_sorted=False, memory_limit=None, tempdir=None, n_jobs=None, compact=True):
     """
     casting rules for a keys object to an index object
 
+    if keys is a Categorical, its index is returned, which is only constructed once
+
     the preferred semantics is that keys is a sequence of key objects,
     except when keys is an instance of tuple,
     in which case the zipped elements of the tuple are the key objects
@@ -300,17 +1618,53 @@ def as_index(keys, axis=semantics.axis_default, base=False, stable=True, lex_as_
 
     if base==True, the most basic index possible is constructed.
     this avoids an indirect sort; if it isnt required, this has better performance
+
+    the method keyword selects the algorithm used to index 1-d keys
+    if method is 'sort', a comparison sort is used
+    if method is 'counting', the keys should be integers, and a counting sort is used
+    if method is 'hash', a HashIndex is constructed, which does not sort at all;
+    it only supports unique, count and membership tests, and its unique keys are not sorted
+    if method is None, a counting sort is used for integer keys of limited range,
+    strings and objects are dictionary encoded, see DictionaryIndex, and a comparison sort is used otherwise
+    a tuple of integer key columns, whose ranges together span at most 64 bits, is packed into a single key,
+    unless method is 'sort', in which case the columns are lexsorted
+    nd-arrays of numeric keys are sorted by packing their columns into as few keys as possible, see RowIndex;
+    other nd-arrays of keys are sorted as void objects
+
+    if assume_sorted==True, the keys are taken to be sorted already, and no sorting is performed at all.
+    the same holds if the keys are found to be sorted, which is checked in O(n) time when possible
+
+    if memory_limit is given, flat keys are indexed by an ExternalIndex, which sorts keys that do not fit in memory,
+    such as a np.memmap, using approximately memory_limit bytes, and temporary files in tempdir
+
+    if n_jobs is given, comparison sorts are performed in parallel, using a pool of n_jobs threads
+
+    if compact==True, index arrays are held in the narrowest integer type which can hold them, such as int32;
+    if compact==False, they are of type intp. this is fixed for the lifetime of the index
     """
-    if isinstance(keys, Index):
-        if type(keys) is BaseIndex and base==False:
-            keys = keys.keys    #need to upcast to an indirectly sorted index type
-        else:
+    if isinstance(keys, Categorical):
+        keys = keys.as_index(base, lex_as_struct)
+    if isinstance(keys, BaseIndex):
+        if lex_as_struct and isinstance(keys.keys, tuple):
+            #lex keys are compared as structs, which sort differently from the columns of a lex index
+            keys = as_struct_array(*keys.keys)
+        elif base or isinstance(keys, Index):
             return keys         #already done here
+        else:
+            keys = keys.keys    #need to upcast to an indirectly sorted index type
     if isinstance(keys, tuple):
         if lex_as_struct:
             keys = as_struct_array(*keys)
+        elif method == 'hash':
+            return HashIndex(as_struct_array(*keys), lex=True)
         else:
-            return LexIndex(keys, stable)
+            ranges = None if method == 'sort' else _packed_ranges(keys)
+            if ranges is not None:
+                return PackedLexIndex(keys, stable, ranges, assume_sorted=assume_sorted, n_jobs=n_jobs, compact=compact)
+            return LexIndex(keys, stable, assume_sorted=assume_sorted, n_jobs=n_jobs, compact=compact)
+
+    if memory_limit is not None:
+        return ExternalIndex(keys, memory_limit, tempdir, compact=compact)
 
     try:
         keys = np.asarray(keys)
@@ -318,13 +1672,34 @@ def as_index(keys, axis=semantics.axis_default, base=False, stable=True, lex_as_
         raise TypeError('Given object does not form a valid set of keys')
     if axis is None:
         keys = keys.flatten()
+    if method == 'hash':
+        return HashIndex(keys, axis)
     if keys.ndim==1:
+        if method == 'counting':
+            if keys.dtype.kind not in 'biu':
+                raise ValueError('counting sort requires integer keys')
+            if keys.size == 0:
+                return Index(keys, stable=stable, compact=compact)
+            return CountingIndex(keys, int(keys.min()), int(keys.max()), compact=compact)
+        #check once whether the keys are sorted, and pass the outcome on to the index
+        presorted = assume_sorted or _is_sorted(keys)
+        if method is None and not presorted and keys.dtype.kind in 'SUO':
+            try:
+                return DictionaryIndex(keys, compact=compact)
+            except TypeError:
+                pass    #unhashable or unorderable objects can only be compared
+        if method is None and not presorted:
+            counting_range = _counting_range(keys)
+            if counting_range is not None:
+                return CountingIndex(keys, *counting_range, compact=compact)
         if base:
-            return BaseIndex(keys)
+            return BaseIndex(keys, assume_sorted=assume_sorted, n_jobs=n_jobs, presorted=presorted, compact=compact)
         else:
-            return Index(keys, stable=stable)
+            return Index(keys, stable=stable, assume_sorted=assume_sorted, n_jobs=n_jobs, presorted=presorted, compact=compact)
+    elif _is_orderable(keys.dtype) and keys.size > 0:
+        return RowIndex(keys, axis, stable=stable, assume_sorted=assume_sorted, n_jobs=n_jobs, compact=compact)
     else:
-        return ObjectIndex(keys, axis, stable=stable)
+        return ObjectIndex(keys, axis, stable=stable, assume_sorted=assume_sorted, n_jobs=n_jobs, compact=compact)
 
 
-__all__ = ['as_index']
+__all__ = ['as_index', 'Categorical']
@@ -0,0 +1,183 @@
+"""jagged array module; a sequence of arrays of varying length, stored as a single contiguous array"""
+from __future__ import absolute_import, division, print_function, unicode_literals
+from builtins import *
+
+import numpy as np
+
+__author__ = "Eelco Hoogendoorn"
+__license__ = "LGPL"
+__email__ = "hoogendoorn.eelco@gmail.com"
+
+
+class JaggedArray(object):
+    """
+    sequence of rows of varying length, stored as a contiguous array of values and an array of offsets,
+    such that row i is given by values[offsets[i]:offsets[i+1]]
+
+    this is the compressed sparse row layout; operations act on all rows at once, and a row is only
+    represented as a separate array object when it is explicitly indexed or iterated over
+    """
+
+    def __init__(self, values, offsets):
+        """
+        Parameters
+        ----------
+        values : ndarray, [n, ...]
+            values of all rows, concatenated along the first axis
+        offsets : ndarray, [rows + 1], int
+            offsets into values of the start of each row, followed by the total number of values
+        """
+        self.values = np.asarray(values)
+        self.offsets = np.asarray(offsets)
+        if self.offsets.ndim != 1 or len(self.offsets) == 0 or self.offsets[-1] != len(self.values):
+            raise ValueError('offsets should be a 1-d array, ending in the number of values')
+
+    @staticmethod
+    def from_lengths(values, lengths):
+        """construct a jagged array from the values and the length of each row"""
+        return JaggedArray(values, np.concatenate(([0], np.cumsum(lengths, dtype=np.intp))))
+
+    @property
+    def lengths(self):
+        """number of values in each row"""
+        return np.diff(self.offsets)
+
+    @property
+    def start(self):
+        """offset of the first value of each row"""
+        return self.offsets[:-1]
+
+    @property
+    def stop(self):
+        """offset one past the last value of each row"""
+        return self.offsets[1:]
+
+    @property
+    def row(self):
+        """row of each value"""
+        return np.repeat(np.arange(len(self)), self.lengths)
+
+    @property
+    def position(self):
+        """position of each value within its row"""
+        return np.arange(len(self.values)) - np.repeat(self.start, self.lengths)
+
+    def __len__(self):
+        return len(self.offsets) - 1
+
+    def __iter__(self):
+        for start, stop in zip(self.start, self.stop):
+            yield self.values[start:stop]
+
+    def __getitem__(self, item):
+        """a single row as an array view, or a selection of rows as a jagged array"""
+        if np.ndim(item) == 0 and not isinstance(item, slice):
+            item = range(len(self))[item]
+            return self.values[self.offsets[item]:self.offsets[item + 1]]
+        if isinstance(item, slice) and item.step in (None, 1):
+            #a contiguous range of rows shares its values with self
+            start, stop, _ = item.indices(len(self))
+            offsets = self.offsets[start:max(start, stop) + 1]
+            return JaggedArray(self.values[offsets[0]:offsets[-1]], offsets - offsets[0])
+        rows = np.arange(len(self))[item]
+        lengths = self.lengths[rows]
+        offsets = np.concatenate(([0], np.cumsum(lengths, dtype=np.intp)))
+        #gather the values of the selected rows, without looping over them
+        index = np.arange(offsets[-1]) + np.repeat(self.start[rows] - offsets[:-1], lengths)
+        return JaggedArray(self.values[index], offsets)
+
+    def __repr__(self):
+        return 'JaggedArray({}, lengths={})'.format(self.values, self.lengths)
+
+    def chunks(self, size):
+        """iterate over the rows in jagged arrays of at most size rows, each of which is a view of self
+
+        Parameters
+        ----------
+        size : int
+            maximum number of rows per chunk
+
+        Yields
+        ------
+        JaggedArray
+        """
+        for start in range(0, len(self), size):
+            yield self[start:start + size]
+
+    def tolist(self):
+        """list of arrays, one per row"""
+        return np.split(self.values, self.offsets[1:-1], axis=0)
+
+    def reduce(self, operator=np.add, dtype=None):
+        """reduce the values of each row, using the given ufunc
+
+        Parameters
+        ----------
+        operator : numpy.ufunc
+            a numpy ufunc, such as np.add or np.maximum
+        dtype : output dtype
+
+        Returns
+        -------
+        ndarray, [rows, ...]
+            values reduced over each row; empty rows take the identity of the operator
+        """
+        lengths = self.lengths
+        nonempty = lengths > 0
+        reduced = operator.reduceat(self.values, self.start[nonempty], axis=0, dtype=dtype)
+        if np.all(nonempty):
+            return reduced
+        if operator.identity is None:
+            raise ValueError('Empty rows can not be reduced by an operator without identity')
+        result = np.full((len(self),) + reduced.shape[1:], operator.identity, reduced.dtype)
+        result[nonempty] = reduced
+        return result
+
+    def sum(self, dtype=None):
+        """sum of each row"""
+        return self.reduce(np.add, dtype)
+
+    def mean(self):
+        """mean of each row"""
+        return self.sum() / self.lengths.reshape((-1,) + (1,) * (self.values.ndim - 1))
+
+    def min(self):
+        """minimum of each row"""
+        return self.reduce(np.minimum)
+
+    def max(self):
+        """maximum of each row"""
+        return self.reduce(np.maximum)
+
+    def to_dense(self, fill_value=None, length=None):
+        """pad the rows to a common length, forming a dense array
+
+        Parameters
+        ----------
+        fill_value : scalar, optional
+            value to pad short rows with; if None, a masked array is returned instead
+        length : int, optional
+            length to pad or truncate the rows to; defaults to the length of the longest row
+
+        Returns
+        -------
+        ndarray or masked_array, [rows, length, ...]
+        """
+        lengths = self.lengths
+        if length is None:
+            length = int(lengths.max()) if len(lengths) else 0
+        position = self.position
+        keep = position < length
+        dense = np.zeros((len(self), length) + self.values.shape[1:], self.values.dtype)
+        mask = np.ones((len(self), length), bool)
+        row = self.row[keep]
+        dense[row, position[keep]] = self.values[keep]
+        mask[row, position[keep]] = False
+        if fill_value is None:
+            mask = np.broadcast_to(mask.reshape(mask.shape + (1,) * (self.values.ndim - 1)), dense.shape)
+            return np.ma.masked_array(dense, mask)
+        dense[mask] = fill_value
+        return dense
+
+
+__all__ = ['JaggedArray']
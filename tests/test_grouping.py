@@ -146,4 +146,289 @@ def test_mean_axis():
     [228, 314, 173, 452, 168, 351, 300, 396]])
 
     unique, final_array = group_by(initial_array[1, :]).mean(initial_array, axis=1)
-    print(final_array)
\ No newline at end of file
+    print(final_array)
+
+def test_presorted():
+    keys = np.sort(np.random.rand(100).round(1))
+    values = np.random.rand(100)
+    g = group_by(keys)
+    assert g.index.presorted
+    assert 'sorter' not in g.index.__dict__
+    npt.assert_equal(g.index.sorted, keys)
+    reference = group_by(keys[::-1])
+    npt.assert_allclose(g.sum(values)[1], reference.sum(values[::-1])[1])
+    npt.assert_equal(g.first(values)[1], reference.last(values[::-1])[1])
+
+    # lex keys, with the last column as primary key
+    k1 = [3, 1, 2, 2, 0]
+    k2 = ['a', 'b', 'b', 'b', 'c']
+    g = group_by((k1, k2))
+    assert g.index.presorted
+    npt.assert_equal(g.sum(values[:5])[1], [values[0], values[1], values[2] + values[3], values[4]])
+    assert not group_by((k2, k1)).index.presorted
+
+    # the caller may also vouch for the keys being sorted
+    g = group_by(keys, assume_sorted=True)
+    npt.assert_equal(g.unique, np.unique(keys))
+
+
+def test_aggregate():
+    keys = np.random.randint(0, 10, 100)
+    values = np.random.rand(100, 3)
+    g = group_by(keys)
+    stats = ['count', 'sum', 'prod', 'mean', 'var', 'std', 'min', 'max', 'first', 'last']
+    unique, aggregates = g.aggregate(values, stats)
+    npt.assert_equal(unique, g.unique)
+    assert list(aggregates) == stats
+    npt.assert_equal(aggregates['count'], g.count)
+    for stat in stats[1:]:
+        npt.assert_allclose(aggregates[stat], getattr(g, stat)(values)[1])
+
+    unique, aggregates = g.aggregate(values.T, ['mean', 'var'], axis=1)
+    npt.assert_allclose(aggregates['var'], g.var(values.T, axis=1)[1])
+
+
+def test_var_cov():
+    keys = np.random.randint(0, 5, 1000)
+    x = np.random.rand(1000, 2) + 1e8     # large offset, to test for cancellation
+    y = np.random.rand(1000, 2)
+    weights = np.random.rand(1000)
+    g = group_by(keys)
+
+    var = np.array([np.var(x[keys == k], axis=0) for k in g.unique])
+    npt.assert_allclose(g.var(x)[1], var, rtol=1e-6)
+    npt.assert_allclose(g.std(x.T, axis=1)[1], np.sqrt(var).T, rtol=1e-6)
+    npt.assert_allclose(g.cov(x, x)[1], var, rtol=1e-6)
+
+    cov = [[np.cov(x[keys == k, i], y[keys == k, i], bias=True, aweights=weights[keys == k])[0, 1]
+            for i in range(2)] for k in g.unique]
+    npt.assert_allclose(g.cov(x, y, weights=weights)[1], cov, rtol=1e-6)
+    npt.assert_allclose(g.var(y, weights=weights[:, None])[1], g.var(y, weights=weights)[1])
+
+
+def test_quantile():
+    keys = np.random.randint(0, 5, 100)
+    values = np.random.randint(0, 20, (100, 3))
+    g = group_by(keys)
+    q = [0, 0.1, 0.5, 0.9, 1]
+    for interpolation in ['linear', 'lower', 'higher', 'midpoint', 'nearest']:
+        reference = [np.percentile(values[keys == k], np.multiply(q, 100), axis=0, method=interpolation) for k in g.unique]
+        unique, quantiles = g.quantile(values, q, interpolation=interpolation)
+        npt.assert_allclose(quantiles, np.swapaxes(reference, 0, 1))
+        unique, quantiles = g.quantile(values.T, 0.9, axis=1, interpolation=interpolation)
+        npt.assert_allclose(quantiles, np.array(reference)[:, 3].T)
+
+    npt.assert_allclose(g.median(values)[1], [np.median(values[keys == k], axis=0) for k in g.unique])
+    npt.assert_equal(group_by([1, 1, 2, 2]).median([4, 1, 3, 2], average=False)[1], [4, 3])
+
+
+def test_topk():
+    keys = [0, 1, 0, 0, 2, 1, 0]
+    values = np.array([3, 5, 1, 3, 4, 6, 2])
+    unique, largest, index = group_by(keys).topk(values, 3)
+    npt.assert_equal(largest.filled(-1), [[3, 3, 2], [6, 5, -1], [4, -1, -1]])
+    npt.assert_equal(index.filled(-1), [[0, 3, 6], [5, 1, -1], [4, -1, -1]])
+    unique, smallest = group_by(keys).topk(values, 2, largest=False, return_index=False)
+    npt.assert_equal(smallest.filled(-1), [[1, 2], [5, 6], [4, -1]])
+
+    keys = np.random.randint(0, 10, 100)
+    values = np.random.rand(100, 2)
+    unique, largest, index = group_by(keys).topk(values, 5)
+    assert largest.shape == (10, 5, 2)
+    for i, k in enumerate(unique):
+        for j in range(2):
+            npt.assert_equal(largest[i, :, j].compressed(), np.sort(values[keys == k, j])[::-1][:5])
+            npt.assert_equal(values[index[i, :, j].compressed(), j], largest[i, :, j].compressed())
+
+    # the groups and the selected values take the place of the reduction axis
+    unique, largest_t, index_t = group_by(keys).topk(values.T, 5, axis=1)
+    assert largest_t.shape == (2, 10, 5)
+    npt.assert_equal(largest_t.filled(-1), np.moveaxis(largest.filled(-1), 2, 0))
+    npt.assert_equal(index_t.filled(-1), np.moveaxis(index.filled(-1), 2, 0))
+
+
+def test_scan():
+    keys = np.random.randint(0, 5, 100)
+    values = np.random.randint(-5, 5, (100, 2))
+    g = group_by(keys)
+    for func, reference in [('cumsum', np.cumsum), ('cumprod', np.cumprod),
+                            ('cummin', np.minimum.accumulate), ('cummax', np.maximum.accumulate)]:
+        expected = np.empty_like(values)
+        for k in g.unique:
+            expected[keys == k] = reference(values[keys == k], axis=0)
+        npt.assert_equal(getattr(g, func)(values), expected)
+        npt.assert_allclose(getattr(g, func)(values.T.astype(float), axis=1), expected.T)
+
+    # groups larger than scan_block are accumulated directly; small integer types are promoted as by np.cumsum
+    large_keys = np.random.randint(0, 3, 2000)
+    large_values = np.random.rand(2000)
+    for dtype in [np.float64, np.bool_, np.int8]:
+        x = (large_values * 200).astype(dtype)
+        expected = np.empty(2000, np.cumsum(x).dtype)
+        for k in range(3):
+            expected[large_keys == k] = np.cumsum(x[large_keys == k])
+        npt.assert_allclose(group_by(large_keys).cumsum(x), expected)
+        npt.assert_equal(group_by(large_keys).cumsum(x).dtype, expected.dtype)
+    npt.assert_equal(group_by(large_keys).cummax(large_values)[large_keys == 0], np.maximum.accumulate(large_values[large_keys == 0]))
+
+    npt.assert_equal(group_by([1, 0, 1, 1, 0]).cumcount(), [0, 0, 1, 2, 1])
+    npt.assert_equal(group_by([1, 0, 1, 1, 0]).rank([5, 2, 3, 5, 1]), [1, 1, 0, 2, 0])
+    rank = g.rank(values)
+    for k in g.unique:
+        npt.assert_equal(rank[keys == k], np.argsort(np.argsort(values[keys == k], axis=0, kind='stable'), axis=0))
+    npt.assert_equal(g.rank(values.T, axis=1), rank.T)
+
+
+def test_transform():
+    keys = np.random.randint(0, 5, 100)
+    values = np.random.rand(100, 3)
+    g = group_by(keys)
+    for reduction in ['mean', 'max', 'count', np.add]:
+        expected = np.empty_like(values)
+        for k in g.unique:
+            group = values[keys == k]
+            if reduction == 'count':
+                expected[keys == k] = len(group)
+            elif reduction is np.add:
+                expected[keys == k] = group.sum(axis=0)
+            else:
+                expected[keys == k] = getattr(group, reduction)(axis=0)
+        npt.assert_allclose(g.transform(values, reduction), expected)
+        npt.assert_allclose(g.transform(values.T, reduction, axis=1), expected.T)
+
+    out = np.empty_like(values)
+    assert g.demean(values, out=out) is out
+    npt.assert_allclose(g.mean(out)[1], 0, atol=1e-12)
+    npt.assert_allclose(g.std(g.zscore(values))[1], 1)
+    npt.assert_allclose(g.sum(g.normalize(values))[1], 1)
+    npt.assert_allclose(g.sum(g.normalize(keys + 1))[1], 1)
+
+    # in place, with out the values themselves
+    for name in ['demean', 'zscore', 'normalize']:
+        inplace = values.copy()
+        assert getattr(g, name)(inplace, out=inplace) is inplace
+        npt.assert_allclose(inplace, getattr(g, name)(values))
+
+
+def test_accumulator():
+    from numpy_indexed import GroupByAccumulator
+    keys = np.random.randint(0, 20, 1000)
+    values = np.random.rand(1000, 2) + 1e6
+    stats = ['count', 'sum', 'mean', 'var', 'std', 'min', 'max', 'first', 'last']
+    unique, expected = group_by(keys).aggregate(values, stats)
+
+    accumulators = [GroupByAccumulator(), GroupByAccumulator()]
+    for i, chunk in enumerate(np.array_split(np.arange(1000), 7)):
+        accumulators[i // 4].update(keys[chunk], values[chunk])
+    result = accumulators[0].merge(accumulators[1]).result(stats)
+    npt.assert_equal(result[0], unique)
+    for stat in stats:
+        npt.assert_allclose(result[1][stat], expected[stat], rtol=1e-6)
+
+
+def test_parallel_aggregate():
+    from numpy_indexed import parallel_aggregate
+    keys = np.random.randint(-50, 50, 10000).astype(np.float64)
+    keys[:10] = [np.nan, -0.0, 0.0, np.nan, 0, 0, 0, 0, 0, 0]
+    values = np.random.rand(10000, 2)
+    stats = ['count', 'sum', 'mean', 'var', 'min', 'max', 'first', 'last']
+    unique, expected = group_by(keys).aggregate(values, stats)
+    for partition in ['hash', 'range']:
+        result = parallel_aggregate(keys, values, stats, n_jobs=3, partition=partition)
+        npt.assert_equal(result[0], unique)
+        for stat in stats:
+            npt.assert_allclose(result[1][stat], expected[stat])
+
+
+def test_scatter_backend():
+    from numpy_indexed.grouping import GroupBy
+    keys = np.random.randint(0, 100, 1000)
+    values = np.random.rand(1000, 3).astype(np.float32)
+    sort = GroupBy(keys, backend='sort')
+    scatter = GroupBy(keys, backend='scatter')
+    assert scatter._scatter(values) and not sort._scatter(values)
+    for reduction in ['sum', 'mean', 'var']:
+        expected = getattr(sort, reduction)(values)[1]
+        result = getattr(scatter, reduction)(values)[1]
+        assert result.dtype == expected.dtype
+        npt.assert_allclose(result, expected, rtol=1e-4)
+    #integer sums are not scattered, to stay exact
+    npt.assert_equal(scatter.sum(keys)[1], sort.sum(keys)[1])
+
+    auto = GroupBy(keys)
+    assert not auto._scatter(values[:, 0])
+    auto.inverse
+    assert auto._scatter(values[:, 0]) and not auto._scatter(values)
+
+
+def test_argmin_axis():
+    keys = np.random.randint(0, 50, 1000)
+    values = np.random.randint(0, 10, (1000, 3)).astype(np.float64)
+    values[5, 1] = np.nan
+    g = group_by(keys)
+    for name, reference in [('argmin', np.argmin), ('argmax', np.argmax)]:
+        unique, index = getattr(g, name)(values)
+        for u, i in zip(unique, index):
+            member = np.flatnonzero(keys == u)
+            npt.assert_equal(i, member[reference(values[member], axis=0)])
+        npt.assert_equal(getattr(g, name)(values.T, axis=1)[1], index.T)
+
+    order = g.argsort_within(values, descending=True)
+    for c in range(3):
+        expected = np.lexsort((-np.arange(1000), values[:, c], keys))[::-1]
+        expected = expected[np.argsort(keys[expected], kind='stable')]
+        npt.assert_equal(order[:, c], expected)
+
+
+def test_value_counts():
+    keys = np.random.randint(0, 20, 1000)
+    values = np.random.randint(0, 5, 1000)
+    g = group_by(keys)
+    k, v, c = g.value_counts(values)
+    table = np.zeros((20, 5), int)
+    np.add.at(table, (keys, values), 1)
+    npt.assert_equal(c, table[k, v])
+    assert c.sum() == 1000
+
+    unique, mode, count = g.mode(values, return_count=True)
+    npt.assert_equal(mode, table[unique].argmax(axis=1))
+    npt.assert_equal(count, table[unique].max(axis=1))
+
+    #modes of rows of values
+    rows = np.stack([values, values * 2], axis=1)
+    npt.assert_equal(g.mode(rows)[1], np.stack([mode, mode * 2], axis=1))
+
+
+def test_jagged():
+    keys = np.random.randint(0, 10, 100)
+    values = np.random.rand(100, 2)
+    g = group_by(keys)
+    jagged = g.split(values, jagged=True)
+    groups = g.split_array_as_list(values)
+    assert len(jagged) == g.groups
+    npt.assert_equal(jagged.lengths, g.count)
+    for row, group in zip(jagged, groups):
+        npt.assert_equal(row, group)
+    npt.assert_equal(jagged[-1], groups[-1])
+    npt.assert_allclose(jagged.sum(), g.sum(values)[1])
+    npt.assert_allclose(jagged.mean(), g.mean(values)[1])
+
+    selected = jagged[[3, 0, 3]]
+    for row, i in zip(selected, [3, 0, 3]):
+        npt.assert_equal(row, groups[i])
+    chunks = list(jagged.chunks(4))
+    assert len(chunks) == 3
+    npt.assert_equal(chunks[1][0], groups[4])
+
+    dense = jagged.to_dense()
+    assert dense.shape == (g.groups, g.count.max(), 2)
+    npt.assert_equal(dense[0, :g.count[0]], groups[0])
+    assert dense.mask[0, g.count[0]:].all() or g.count[0] == g.count.max()
+    padded = jagged.to_dense(fill_value=-1, length=3)
+    for row, group in zip(padded, groups):
+        npt.assert_equal(row[:len(group)], group[:3])
+        assert (row[len(group):] == -1).all()
+
+    from numpy_indexed import JaggedArray
+    empty = JaggedArray.from_lengths([1, 2], [0, 2, 0])
+    npt.assert_equal(empty.sum(), [0, 3, 0])
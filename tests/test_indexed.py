@@ -4,11 +4,14 @@ many functions could still do with better test coverage!
 
 from __future__ import absolute_import, division, print_function, unicode_literals
 
+import os
+
 import numpy.testing as npt
 import pytest
 
 from numpy_indexed import *
 from numpy_indexed.utility import *
+from numpy_indexed.index import Index, CountingIndex, HashIndex, ExternalIndex, PackedLexIndex, RowIndex, DictionaryIndex
 
 
 __author__ = "Eelco Hoogendoorn"
@@ -275,3 +278,344 @@ def test_table_max():
     idx = idx.reshape(-1, 3)
     u, r = Table(idx[:,0], idx[:,1]).max(idx[:,2], default=0)
     npt.assert_array_equal(r, result)
+
+
+def test_index_cache():
+    keys = np.random.randint(0, 10, 100)
+    index = as_index(keys, method='sort')
+    assert index.inverse is index.inverse
+    assert list(index.cache_info) == ['sorted_group_rank_per_key', 'inverse']
+    npt.assert_equal(index.unique[index.inverse], keys)
+    #cached arrays are read-only, while the public functions return writable copies of them, like numpy
+    with pytest.raises(ValueError):
+        index.inverse[0] = -1
+    assert all(a.flags.writeable for a in unique(keys, return_index=True, return_inverse=True, return_count=True))
+    g = group_by(keys)
+    g.count[:] = 0
+    g.unique[:] = 0
+    npt.assert_equal(g.count, count(keys)[1])
+    npt.assert_equal(g.unique[g.inverse], keys)
+
+    index.clear_cache('inverse', 'unique')
+    assert list(index.cache_info) == ['sorted_group_rank_per_key']
+    index.clear_cache()
+    assert len(index.cache_info) == 0
+
+    index.cache_limit = index.size * 4
+    index.inverse, index.rank
+    assert list(index.cache_info) == ['rank']
+    npt.assert_equal(index.sorted[index.rank], keys)
+
+
+def test_counting_index():
+    for dtype in [np.bool_, np.int8, np.uint16, np.int64, np.uint64]:
+        keys = np.random.randint(0, 2 if dtype is np.bool_ else 100, 1000).astype(dtype)
+        index = as_index(keys)
+        assert isinstance(index, CountingIndex)
+        reference = as_index(keys, method='sort')
+        npt.assert_equal(index.sorter, reference.sorter)
+        npt.assert_equal(index.sorted, reference.sorted)
+        npt.assert_equal(index.slices, reference.slices)
+        npt.assert_equal(index.unique, reference.unique)
+        npt.assert_equal(index.inverse, reference.inverse)
+        assert index.unique.dtype == keys.dtype
+
+    # multi-pass radix sort, and negative keys
+    keys = np.random.randint(-100000, 100000, 200000)
+    index = as_index(keys, method='counting')
+    npt.assert_equal(index.sorter, np.argsort(keys, kind='mergesort'))
+    npt.assert_equal(index.count, np.unique(keys, return_counts=True)[1])
+
+
+def test_hash_index():
+    keys = np.random.randint(0, 50, 1000) * 1.5
+    u, c = count(keys, method='hash')
+    assert not np.all(np.diff(u) > 0)
+    npt.assert_equal(np.sort(u), np.unique(keys))
+    npt.assert_equal(c[np.argsort(u)], count(keys)[1])
+
+    u, idx, inv = unique(keys, return_index=True, return_inverse=True, method='hash')
+    npt.assert_equal(u[inv], keys)
+    npt.assert_equal(keys[idx], u)
+    npt.assert_equal(idx, np.unique(keys, return_index=True)[1][np.argsort(np.argsort(u))])
+    npt.assert_equal(HashIndex(keys, sort=True).unique, np.unique(keys))
+
+    # void row keys and lex keys
+    rows = np.random.randint(0, 3, (100, 3))
+    npt.assert_equal(HashIndex(rows, sort=True).unique, unique(rows))
+    u = unique(tuple(rows.T), method='hash')
+    assert isinstance(u, tuple) and len(u[0]) == len(unique(rows))
+    # float fields of lex keys equal to each other hash equal, as 1-d float keys do
+    u = unique((np.array([0., -0.]), np.array([1, 1])), method='hash')
+    assert len(u[0]) == 1
+    with pytest.raises(TypeError):
+        HashIndex(keys).merge(HashIndex(keys))
+    # nans match each other, as they do in the sorted search; object keys can not be hashed
+    npt.assert_equal(in_([np.nan, 1.], [np.nan, 2.], method='hash'), in_([np.nan, 1.], [np.nan, 2.]))
+    assert len(unique((np.array([np.nan, -np.nan]), np.array([1, 1])), method='hash')[0]) == 1
+    with pytest.raises(ValueError):
+        HashIndex(np.array(['a', 1], dtype=object))
+
+    # membership, also for queries of a different dtype
+    this = np.random.randint(0, 9, 20)
+    that = np.random.randint(0, 4, 10) * 1.5
+    npt.assert_equal(in_(this, that, method='hash'), in_(this, that))
+    npt.assert_equal(contains(that, this, method='hash'), contains(that, this))
+    npt.assert_equal(in_(rows, rows[:50], method='hash'), in_(rows, rows[:50]))
+    npt.assert_equal(in_(this, [], method='hash'), False)
+    npt.assert_equal(in_([], that, method='hash'), [])
+
+
+def test_index_merge():
+    a, b = np.random.randint(0, 5, 30), np.random.randint(3, 9, 20)
+    for method in ['sort', 'counting']:
+        merged = as_index(a, method=method).extend(b)
+        reference = as_index(np.concatenate((a, b)), method='sort')
+        npt.assert_equal(merged.sorter, reference.sorter)
+        npt.assert_equal(merged.slices, reference.slices)
+        npt.assert_equal(merged.unique, reference.unique)
+        npt.assert_equal(merged.inverse, reference.inverse)
+
+    merged = as_index(a * 1.5, base=True).merge(as_index(b * 1.5, base=True))
+    npt.assert_equal(merged.unique, np.unique(np.concatenate((a, b)) * 1.5))
+    npt.assert_equal(merged.count, count(np.concatenate((a, b)))[1])
+
+    # object keys
+    a, b = np.random.randint(0, 3, (30, 2)), np.random.randint(0, 3, (20, 2))
+    merged = as_index(a).extend(b)
+    reference = as_index(np.concatenate((a, b)))
+    npt.assert_equal(merged.sorter, reference.sorter)
+    npt.assert_equal(merged.unique, reference.unique)
+    npt.assert_equal(merged.keys, np.concatenate((a, b)))
+
+    # lex keys, including string and nd columns
+    k1, k2, k3 = list('aabbcab'), np.random.randint(0, 3, 7), np.random.randint(0, 2, (7, 2))
+    merged = as_index((k1[:3], k2[:3], k3[:3])).extend((k1[3:], k2[3:], k3[3:]))
+    reference = as_index((k1, k2, k3))
+    npt.assert_equal(merged.sorter, reference.sorter)
+    for m, r in zip(merged.unique, reference.unique):
+        npt.assert_equal(m, r)
+
+
+def test_index_save_load(tmpdir):
+    keys = [
+        np.random.rand(20).round(1),                        # Index
+        np.random.randint(0, 5, 20),                        # CountingIndex
+        np.sort(np.random.randint(0, 50, 20) * 100),        # presorted
+        np.random.randint(0, 2, (20, 3)).astype(np.int8),   # ObjectIndex
+        (list('aabbaabbaabbaabbaabb'), np.random.randint(0, 2, 20)),    # LexIndex
+        (np.random.randint(0, 5, 20), np.random.randint(0, 5, 20)),     # PackedLexIndex
+        (np.arange(20) % 10, np.arange(20) // 10),                      # presorted PackedLexIndex
+    ]
+    for i, k in enumerate(keys):
+        index = as_index(k)
+        path = str(tmpdir.join(str(i)))
+        index.save(path)
+        loaded = Index.load(path, mmap_mode='r')
+        assert type(loaded) is type(index)
+        npt.assert_equal(loaded.sorter, index.sorter)
+        npt.assert_equal(loaded.slices, index.slices)
+        npt.assert_equal(loaded.keys, index.keys)
+        npt.assert_equal(loaded.unique, index.unique)
+        npt.assert_equal(loaded.inverse, index.inverse)
+        if not isinstance(k, tuple):
+            npt.assert_equal(indices(loaded, k), indices(index, k))
+        npt.assert_equal(group_by(loaded).sum(np.ones(20)), group_by(index).sum(np.ones(20)))
+
+    index = as_index(keys[0])
+    index.save(str(tmpdir.join('mmap')))
+    loaded = Index.load(str(tmpdir.join('mmap')), mmap_mode='r')
+    assert isinstance(loaded.sorter, np.memmap)
+    npt.assert_equal(in_(keys[0], loaded), True)
+    npt.assert_equal(remap(keys[0], loaded, np.arange(20)), remap(keys[0], index, np.arange(20)))
+
+
+def test_external_index(tmpdir):
+    keys = np.random.randint(0, 50, 1000) * 0.5
+    keys[::7] = np.nan
+    mm = np.lib.format.open_memmap(str(tmpdir.join('keys.npy')), mode='w+', dtype=keys.dtype, shape=keys.shape)
+    mm[:] = keys
+    index = as_index(mm, memory_limit=1000, tempdir=str(tmpdir))
+    assert isinstance(index, ExternalIndex)
+    reference = as_index(keys, method='sort')
+    npt.assert_equal(index.sorter, reference.sorter)
+    npt.assert_equal(index.slices, reference.slices)
+    npt.assert_equal(index.unique, reference.unique)
+    npt.assert_equal(index.count, reference.count)
+
+    values = np.random.rand(1000, 2)
+    npt.assert_allclose(group_by(index).sum(values)[1], group_by(keys).sum(values)[1])
+    npt.assert_equal(group_by(index).max(values)[1], group_by(keys).max(values)[1])
+    index.close()
+    assert not os.path.exists(index.path)
+
+    #the temporary directory is removed on leaving a with block, or when the index is collected
+    with as_index(mm, memory_limit=1000, tempdir=str(tmpdir)) as index:
+        path = index.path
+        assert os.path.exists(path)
+    assert not os.path.exists(path)
+    index = as_index(mm, memory_limit=1000, tempdir=str(tmpdir))
+    path = index.path
+    del index
+    assert not os.path.exists(path)
+
+    #closing a loaded copy leaves the directory of the original alone
+    index = as_index(mm, memory_limit=1000, tempdir=str(tmpdir))
+    index.save(str(tmpdir.join('saved')))
+    loaded = Index.load(str(tmpdir.join('saved')))
+    npt.assert_equal(loaded.sorter, reference.sorter)
+    loaded.close()
+    assert os.path.exists(index.path)
+    npt.assert_equal(index.sorter, reference.sorter)
+    index.close()
+
+
+def test_parallel_index():
+    keys = np.random.randint(0, 1000, 10000) * 0.5
+    for n_jobs in [1, 3, 4]:
+        index = as_index(keys, n_jobs=n_jobs)
+        reference = as_index(keys)
+        npt.assert_equal(index.sorter, reference.sorter)
+        npt.assert_equal(index.sorted, reference.sorted)
+        npt.assert_equal(index.slices, reference.slices)
+        npt.assert_equal(as_index(keys, base=True, n_jobs=n_jobs).count, reference.count)
+
+    k1, k2 = np.random.randint(0, 10, (2, 1000))
+    index = as_index((k1, k2), n_jobs=4)
+    npt.assert_equal(index.sorter, as_index((k1, k2)).sorter)
+
+    rows = np.random.randint(0, 3, (1000, 3))
+    npt.assert_equal(as_index(rows, n_jobs=4).sorter, as_index(rows).sorter)
+
+
+def test_compact_index():
+    keys = np.random.randint(0, 100, 1000) * 0.5
+    index = as_index(keys)
+    assert index.sorter.dtype == np.int32
+    assert index.slices.dtype == np.int32
+    assert index.rank.dtype == np.int32
+    assert index.inverse.dtype == np.int16
+    npt.assert_equal(index.unique[index.inverse], keys)
+    npt.assert_equal(as_index(np.arange(70000)).inverse.dtype, np.int32)
+    # compact types are internal; counts and the indices returned by the public functions are intp
+    assert index.count.dtype == np.intp
+    assert all(a.dtype == np.intp for a in unique(keys, return_index=True, return_inverse=True, return_count=True)[1:])
+    assert group_by(np.zeros(70000, int)).count ** 2 == 70000 ** 2
+
+    # the choice of types is fixed when the index is built
+    for k in [keys, np.random.randint(0, 100, 1000), (keys, keys), np.random.rand(1000, 2).round(1)]:
+        index = as_index(k, compact=False)
+        assert index.sorter.dtype == np.intp
+        assert index.slices.dtype == np.intp
+        assert index.inverse.dtype == np.intp
+        npt.assert_equal(index.inverse, as_index(k).inverse)
+    assert group_by(keys, compact=False).index.inverse.dtype == np.intp
+    with pytest.raises(AttributeError):
+        index.compact = True
+
+
+def test_packed_lex_index():
+    site = np.random.randint(-5, 5, 1000).astype(np.int8)
+    sensor = np.random.randint(0, 2**20, 1000).astype(np.uint32)
+    day = np.random.randint(-2**35, 2**35, 1000)
+    keys = (site, sensor, day)
+    index = as_index(keys)
+    assert isinstance(index, PackedLexIndex)
+    reference = as_index(keys, method='sort')
+    assert not isinstance(reference, PackedLexIndex)
+    npt.assert_equal(index.sorter, reference.sorter)
+    npt.assert_equal(index.slices, reference.slices)
+    for u, r in zip(index.unique, reference.unique):
+        assert u.dtype == r.dtype
+        npt.assert_equal(u, r)
+
+    #extremes of the int64 range, and constant columns
+    keys = (np.array([2**63-1, -2**63, 0, -2**63]), np.array([3, 3, 3, 3]))
+    index = as_index(keys)
+    assert isinstance(index, PackedLexIndex)
+    npt.assert_equal(index.unique[0], [-2**63, 0, 2**63-1])
+    npt.assert_equal(index.count, [2, 1, 1])
+
+    #ranges which do not fit in 64 bits are lexsorted
+    assert not isinstance(as_index((day, day)), PackedLexIndex)
+
+
+def test_row_index():
+    keys = np.random.randint(-3, 3, (1000, 3)).astype(np.int32)
+    index = as_index(keys)
+    assert isinstance(index, RowIndex)
+    npt.assert_equal(index.unique, np.unique(keys, axis=0))
+    npt.assert_equal(index.sorted_keys, keys[index.sorter])
+    npt.assert_equal(index.keys, keys)
+    npt.assert_equal(index.unique[index.inverse], keys)
+    assert all_unique(index.unique)
+
+    #columns spanning the full 64 bits are sorted in multiple passes
+    keys = np.random.randint(0, 4, (1000, 3)).astype(np.uint64) << np.uint64(62)
+    npt.assert_equal(as_index(keys).sorter, np.lexsort(keys.T[::-1]))
+
+    #rows of floats are grouped by bitwise equality, as void objects are
+    keys = np.array([[0., 1], [-0., 1], [np.nan, 2], [np.nan, 2], [-1.5, 3]])
+    index = as_index(keys)
+    npt.assert_equal(index.count, [1, 1, 1, 2])
+    npt.assert_equal(index.unique[:3], [[-1.5, 3], [-0., 1], [0., 1]])
+
+    this, that = np.random.randint(0, 3, (2, 100, 2))
+    npt.assert_equal(in_(this, that), [np.any(np.all(t == that, axis=1)) for t in this])
+
+
+def test_dictionary_index():
+    keys = np.array(['b', 'a', 'c', 'a', 'b', 'b'])
+    for k in [keys, keys.astype('S'), keys.astype(object)]:
+        index = as_index(k)
+        assert isinstance(index, DictionaryIndex)
+        reference = as_index(k, method='sort')
+        npt.assert_equal(index.unique, reference.unique)
+        npt.assert_equal(index.sorter, reference.sorter)
+        npt.assert_equal(index.sorted, reference.sorted)
+        npt.assert_equal(index.inverse, reference.inverse)
+        npt.assert_equal(index.count, reference.count)
+
+    npt.assert_equal(in_(['a', 'x', 'c'], keys), [True, False, True])
+    npt.assert_equal(contains(keys, ['a', 'x']), [True, False])
+    npt.assert_equal(indices(keys, ['c', 'z'], missing=-1), [2, -1])
+    npt.assert_equal(remap(['a', 'q', 'b'], ['a', 'b'], ['A', 'B']), ['A', 'q', 'B'])
+
+    merged = as_index(keys).extend(['z', 'a'])
+    npt.assert_equal(merged.unique, ['a', 'b', 'c', 'z'])
+    npt.assert_equal(merged.sorter, as_index(np.append(keys, ['z', 'a']), method='sort').sorter)
+
+    #unhashable objects are sorted by comparison
+    lists = np.empty(3, object)
+    lists[:] = [[1], [2], [1]]
+    assert not isinstance(as_index(lists), DictionaryIndex)
+
+
+def test_categorical():
+    keys = np.random.randint(0, 100, 1000) * 0.5
+    c = Categorical(keys)
+    assert c._index is None
+    npt.assert_equal(count(c)[1], count(keys)[1])
+    assert not isinstance(c._index, Index)
+    base = c._index
+
+    npt.assert_equal(c.uniques[c.codes], keys)
+    index = c.index
+    assert index is not base
+    for func in [lambda k: group_by(k).index, lambda k: as_index(k), lambda k: as_index(k, base=True)]:
+        assert func(c) is index
+    npt.assert_equal(in_([0.5, 0.25], c), [0.5 in keys, False])
+    npt.assert_equal(in_([0.5, 0.25], c, method='hash'), [0.5 in keys, False])
+    npt.assert_equal(indices(c, keys[:10]), indices(keys, keys[:10]))
+    assert c.index is index
+    assert len(c) == 1000 and c.groups == len(unique(keys))
+
+    # tuple keys, which the set functions compare as structs
+    a, b = np.random.randint(0, 5, 100), np.random.randint(0, 5, 100)
+    c = Categorical((a, b))
+    query = (np.array([a[0], 9]), np.array([b[0], 9]))
+    npt.assert_equal(in_(query, c), [True, False])
+    npt.assert_equal(contains(c, query), [True, False])
+    npt.assert_equal(indices(c, query, missing=-1), indices((a, b), query, missing=-1))
+    assert as_index(c, lex_as_struct=True) is c.as_index(lex_as_struct=True)
+    npt.assert_equal(group_by(c).sum(a)[1], group_by((a, b)).sum(a)[1])